@@ -0,0 +1,168 @@
+import pyxes, argparse, os, random, subprocess, time, tracemalloc
+
+image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'img.png')
+
+class Mover (pyxes.GameObject):
+    def __init__(self, x, y, speed_x, speed_y):
+        super().__init__(x=x, y=y, width=8, height=8, color=pyxes.Colors['white'])
+        self.speed_x = speed_x
+        self.speed_y = speed_y
+    def update(self):
+        delta_time = self.scene.game.delta_time
+        self.x = (self.x + self.speed_x * delta_time) % 2000
+        self.y = (self.y + self.speed_y * delta_time) % 2000
+
+class Collider (pyxes.GameObject):
+    def __init__(self, x, y):
+        super().__init__(x=x, y=y, width=12, height=12)
+        self.collisions = 0
+    def on_collide(self, other):
+        self.collisions += 1
+
+class Bullet (pyxes.GameObject):
+    def __init__(self, x, y):
+        super().__init__(x=x, y=y, width=4, height=4, color=pyxes.Colors['yellow'])
+        self.life = 10
+    def update(self):
+        self.y -= 5
+        self.life -= 1
+        if self.life <= 0:
+            self.scene.remove_game_object(self.name)
+
+class Listener (pyxes.GameObject):
+    def __init__(self):
+        super().__init__(visible=False)
+        self.events = 0
+    def key_down(self, event, key_name):
+        self.events += 1
+    def mouse_motion(self, event, key_name):
+        self.events += 1
+
+class ResetScene (pyxes.Scene):
+    def __init__(self, count):
+        super().__init__()
+        self.count = count
+    def load(self):
+        for index in range(self.count):
+            self.instant_game_object(pyxes.GameObject(x=index % 640, y=index // 640, z=index % 5))
+
+def setup_moving_objects(game, scene, count):
+    for _ in range(count):
+        scene.instant_game_object(Mover(random.uniform(0, 2000), random.uniform(0, 2000), random.uniform(-100, 100), random.uniform(-100, 100)))
+
+def setup_entities(game, scene, count):
+    entities = scene.add_game_object('entities', pyxes.EntityArray(capacity=count))
+    entities.spawn_many(count, x=pyxes.numpy.random.uniform(0, 2000, count), y=pyxes.numpy.random.uniform(0, 2000, count), speed_x=pyxes.numpy.random.uniform(-100, 100, count), speed_y=pyxes.numpy.random.uniform(-100, 100, count))
+
+def setup_images(game, scene, count):
+    for _ in range(count):
+        scene.instant_game_object(pyxes.Image(image_path=image_path, x=random.uniform(0, 640), y=random.uniform(0, 480), image_width=32, image_height=32, image_rotation=random.choice([0, 90, 180])))
+
+def setup_collisions(game, scene, count):
+    size = int(count ** 0.5) * 10
+    for _ in range(count):
+        scene.instant_game_object(Collider(random.uniform(0, size), random.uniform(0, size)))
+
+def setup_spawn(game, scene, count):
+    def spawn():
+        for _ in range(count // 10):
+            scene.instant_game_object(Bullet(random.uniform(0, 640), 480))
+    scene.update = spawn
+
+def setup_events(game, scene, count):
+    for _ in range(count):
+        scene.instant_game_object(Listener())
+    def post_events():
+        for index in range(20):
+            pyxes.pygame.event.post(pyxes.pygame.event.Event(pyxes.pygame.KEYDOWN, key=pyxes.pygame.K_a, mod=0, unicode='a', scancode=4))
+            pyxes.pygame.event.post(pyxes.pygame.event.Event(pyxes.pygame.MOUSEMOTION, pos=(index, index), rel=(1, 1), buttons=(0, 0, 0)))
+    scene.update = post_events
+
+def setup_scene_reset(game, scene, count):
+    reset_scene = game.add_scene('reset', ResetScene(count))
+    reset_scene.update = reset_scene.reset
+    game.change_scene('reset')
+
+scenarios = {
+    'moving_objects': setup_moving_objects,
+    'entities': setup_entities,
+    'images': setup_images,
+    'collisions': setup_collisions,
+    'spawn': setup_spawn,
+    'events': setup_events,
+    'scene_reset': setup_scene_reset,
+}
+
+def create_game(scenario, count):
+    random.seed(0)
+    scene = pyxes.Scene()
+    game = pyxes.Game(width=640, height=480, headless=True, fixed_timestep=1 / 60, default_scene=scene)
+    scenarios[scenario](game, scene, count)
+    return game
+
+def get_percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+def run_scenario(scenario, count, frames, warmup):
+    game = create_game(scenario, count)
+    for _ in range(warmup):
+        game.step()
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.step()
+        frame_times.append((time.perf_counter() - start) * 1000)
+
+    # memory is measured on a separate run because tracemalloc slows everything down
+    tracemalloc.start()
+    game = create_game(scenario, count)
+    for _ in range(min(frames, 10)):
+        game.step()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'scenario': scenario,
+        'count': count,
+        'frames': frames,
+        'fps': 1000 * frames / sum(frame_times),
+        'p50': get_percentile(frame_times, 50),
+        'p99': get_percentile(frame_times, 99),
+        'peak_memory': peak_memory,
+    }
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline = None):
+    baseline_results = {}
+    if baseline != None:
+        baseline_results = {result['scenario']: result for result in baseline['results']}
+    print(f'{"scenario":<16}{"count":>8}{"fps":>10}{"p50 ms":>10}{"p99 ms":>10}{"peak MB":>10}')
+    for result in results:
+        line = f'{result["scenario"]:<16}{result["count"]:>8}{result["fps"]:>10.1f}{result["p50"]:>10.3f}{result["p99"]:>10.3f}{result["peak_memory"] / 1024 / 1024:>10.2f}'
+        previous = baseline_results.get(result['scenario'])
+        if previous != None:
+            line += f'  ({(result["fps"] / previous["fps"] - 1) * 100:+.1f}% fps)'
+        print(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pyxes benchmarks')
+    parser.add_argument('--scenarios', default=','.join(scenarios), help='comma separated list of: ' + ', '.join(scenarios))
+    parser.add_argument('--count', type=int, default=1000, help='game objects per scenario')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file of a previous run')
+    args = parser.parse_args()
+
+    results = [run_scenario(scenario, args.count, args.frames, args.warmup) for scenario in args.scenarios.split(',')]
+    baseline = pyxes.load_json(args.compare) if args.compare else None
+    print_results(results, baseline)
+
+    if args.json:
+        pyxes.write_json(args.json, {'commit': get_commit(), 'time': time.time(), 'results': results})
@@ -1,12 +1,49 @@
-import pygame, json, uuid, datetime, os, copy
+import pygame, json, uuid, datetime, os, bisect, collections, math, time, csv, concurrent.futures, queue, threading, zlib, struct, base64, mmap, stat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 def load_json(path):
     with open(path, 'r') as f:
         return json.load(f)
 
 def write_json(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f)
+    write_file(path, [json.dumps(data).encode()])
+
+def create_temp_file(path):
+    # created like open() would, so the umask gives new files their usual mode
+    while True:
+        temp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f'{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp')
+        try:
+            return (os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666), temp_path)
+        except FileExistsError:
+            continue
+
+def write_file(path, chunks):
+    # written next to the target and renamed over it, so a crash never leaves a half written file
+    descriptor, temp_path = create_temp_file(path)
+    try:
+        try:
+            f = os.fdopen(descriptor, 'wb')
+        except BaseException:
+            os.close(descriptor)
+            raise
+        with f:
+            # a replaced file keeps its mode
+            try:
+                os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+            except FileNotFoundError:
+                pass
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
 
 def delete_json(path):
     os.remove(path)
@@ -28,6 +65,60 @@ def is_collide(a, b):
         a.y < (b.y + b.height)
     )
 
+def objects_collide(a, b):
+    # entity arrays collide with their entities instead of their whole bounds
+    if b.bulk_collision == True:
+        a, b = b, a
+    if a.bulk_collision == True:
+        if b.bulk_collision == True:
+            return len(b) > 0 and len(a.get_collisions(*b.get_bounds())) > 0
+        return len(a.get_collisions(b.x, b.y, b.width, b.height)) > 0
+    return is_collide(a, b)
+
+def bounds_collide(a, b):
+    return a[0] + a[2] > b[0] and a[0] < b[0] + b[2] and a[1] + a[3] > b[1] and a[1] < b[1] + b[3]
+
+def get_union_bounds(a, b):
+    x = min(a[0], b[0])
+    y = min(a[1], b[1])
+    return (x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y)
+
+def get_rotated_size(width, height, rotation):
+    if rotation % 360 == 0:
+        return (width, height)
+    radians = math.radians(rotation)
+    cos = abs(math.cos(radians))
+    sin = abs(math.sin(radians))
+    return (width * cos + height * sin + 1, width * sin + height * cos + 1)
+
+container_types = (list, dict, set)
+if numpy != None:
+    container_types += (numpy.ndarray,)
+
+def copy_field(value):
+    # containers are copied so snapshots don't change with the object, everything else is shared
+    if type(value) == dict:
+        # dicts can hold arrays, like the columns of an EntityArray
+        return {key: copy_field(item) for key, item in value.items()}
+    if type(value) in container_types:
+        return value.copy()
+    return value
+
+def take_snapshot(target, fields):
+    state = target.__dict__
+    return {field: copy_field(state[field]) for field in fields if field in state}
+
+class_attributes = {}
+
+def get_class_attributes(cls):
+    attributes = class_attributes.get(cls)
+    if attributes == None:
+        attributes = class_attributes[cls] = frozenset(dir(cls))
+    return attributes
+
+def has_handler(target, name):
+    return name in get_class_attributes(type(target)) or name in getattr(target, '__dict__', ())
+
 class ObjectPlaceholder:
     def __init__(self, x, y, width, height):
         self.x = x
@@ -53,7 +144,305 @@ Colors = {
     'lightgreen': (144, 238, 144),
 }
 
+Events = {
+    'key_down': pygame.KEYDOWN,
+    'key_up': pygame.KEYUP,
+    'mouse_down': pygame.MOUSEBUTTONDOWN,
+    'mouse_up': pygame.MOUSEBUTTONUP,
+    'mouse_motion': pygame.MOUSEMOTION,
+    'mouse_wheel': pygame.MOUSEWHEEL,
+    'joy_axis_motion': pygame.JOYAXISMOTION,
+    'joy_button_down': pygame.JOYBUTTONDOWN,
+    'joy_button_up': pygame.JOYBUTTONUP,
+    'quit': pygame.QUIT,
+    'fullscreen': pygame.FULLSCREEN,
+    'resize': pygame.VIDEORESIZE,
+    'expose': pygame.VIDEOEXPOSE,
+    'focus': pygame.ACTIVEEVENT,
+}
+
+GameObjectEvents = ['on_click', 'on_collide', 'on_pause', 'mouse_enter', 'mouse_leave']
+
+def get_surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+def get_sound_bytes(sound):
+    frequency, size, channels = pygame.mixer.get_init()
+    return round(sound.get_length() * frequency) * abs(size) // 8 * channels
+
+class LRUCache:
+    def __init__(self, max_bytes = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.items = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+    def get(self, key):
+        item = self.items.get(key)
+        if item == None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+    def set(self, key, value, size):
+        if key in self.items:
+            self.bytes -= self.items.pop(key)[1]
+        self.items[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            self.bytes -= self.items.popitem(last=False)[1][1]
+        return value
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        while self.bytes > self.max_bytes and len(self.items) > 0:
+            self.bytes -= self.items.popitem(last=False)[1][1]
+    def clear(self):
+        self.items.clear()
+        self.bytes = 0
+
+class Atlas:
+    def __init__(self, width = 1024, height = 1024, padding = 1):
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.sheet = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.converted = False
+        self.regions = {}
+        self.images = {}
+        # shelf packing, images are placed left to right in rows as tall as the tallest image in them
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+    def add(self, name, image):
+        width, height = image.get_size()
+        if self.shelf_x + width > self.width:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height + self.padding
+            self.shelf_height = 0
+        if self.shelf_x + width > self.width or self.shelf_y + height > self.height:
+            return None
+        region = self.regions[name] = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+        # the region is empty, max copies the pixels as they are instead of blending them over it
+        self.sheet.blit(image, region, special_flags=pygame.BLEND_RGBA_MAX)
+        self.images.pop(name, None)
+        self.shelf_x += width + self.padding
+        self.shelf_height = max(self.shelf_height, height)
+        return region
+    def get_sheet(self):
+        if self.converted == False and pygame.display.get_surface() != None:
+            self.sheet = self.sheet.convert_alpha()
+            self.converted = True
+            self.images = {}
+        return self.sheet
+    def get_image(self, name):
+        sheet = self.get_sheet()
+        image = self.images.get(name)
+        if image == None:
+            image = self.images[name] = sheet.subsurface(self.regions[name])
+        return image
+
+class AssetTask:
+    def __init__(self, paths):
+        self.paths = list(dict.fromkeys(paths))
+        self.pending = {}
+        self.errors = {}
+    def get_progress(self):
+        if not self.paths:
+            return 1.0
+        return (len(self.paths) - len(self.pending)) / len(self.paths)
+    def is_done(self):
+        return not self.pending
+
+class AssetStore:
+    def __init__(self, max_variant_bytes = 64 * 1024 * 1024, angle_step = 1, workers = 4, max_text_bytes = 16 * 1024 * 1024):
+        self.fonts = {}
+        self.sounds = {}
+        self.texts = LRUCache(max_text_bytes)
+        self.glyph_atlases = {}
+        self.images = {}
+        self.atlases = {}
+        self.converted = set()
+        self.variants = LRUCache(max_variant_bytes)
+        self.angle_step = angle_step
+        self.workers = workers
+        self.executor = None
+        self.loading = {}
+        self.tasks = []
+    def is_loaded(self, path):
+        return path in self.images or path in self.atlases
+    def load_images_async(self, paths):
+        task = AssetTask(paths)
+        for path in task.paths:
+            if self.is_loaded(path):
+                continue
+            # paths already loading for another task share the same future
+            future = self.loading.get(path)
+            if future == None:
+                if self.executor == None:
+                    self.executor = concurrent.futures.ThreadPoolExecutor(self.workers, 'pyxes-assets')
+                future = self.loading[path] = self.executor.submit(pygame.image.load, path)
+            task.pending[path] = future
+        if task.pending:
+            self.tasks.append(task)
+        return task
+    def poll(self):
+        # decoded images are stored and converted on the main thread
+        for task in self.tasks:
+            for path, future in list(task.pending.items()):
+                if not future.done():
+                    continue
+                del task.pending[path]
+                self.loading.pop(path, None)
+                if future.exception() != None:
+                    task.errors[path] = future.exception()
+                    continue
+                if not self.is_loaded(path):
+                    self.images[path] = future.result()
+                self.load_image(path)
+        self.tasks = [task for task in self.tasks if task.pending]
+    def wait(self, task):
+        concurrent.futures.wait(list(task.pending.values()))
+        self.poll()
+        return task
+    def load_image(self, path):
+        atlas = self.atlases.get(path)
+        if atlas != None:
+            return atlas.get_image(path)
+        image = self.images.get(path)
+        if image == None:
+            image = self.images[path] = pygame.image.load(path)
+        # convert_alpha needs a display mode, images loaded before the game starts are converted later
+        if path not in self.converted and pygame.display.get_surface() != None:
+            image = self.images[path] = image.convert_alpha()
+            self.converted.add(path)
+        return image
+    def pack_images(self, paths, width = 1024, height = 1024, padding = 1):
+        # tallest images first packs the shelves tighter
+        images = sorted(((path, self.load_image(path)) for path in paths), key=lambda item: item[1].get_height(), reverse=True)
+        atlases = []
+        for path, image in images:
+            if image.get_width() > width or image.get_height() > height:
+                continue
+            if not atlases or atlases[-1].add(path, image) == None:
+                atlases.append(Atlas(width, height, padding))
+                atlases[-1].add(path, image)
+            self.atlases[path] = atlases[-1]
+            self.images.pop(path, None)
+            self.converted.discard(path)
+            self.remove_variants(path)
+        for atlas in atlases:
+            atlas.get_sheet()
+        return atlases
+    def unload_image(self, path):
+        self.images.pop(path, None)
+        self.atlases.pop(path, None)
+        self.converted.discard(path)
+        self.remove_variants(path)
+    def get_sound(self, path):
+        # decoded once and shared by every Sound playing the same path
+        sound = self.sounds.get(path)
+        if sound == None:
+            sound = self.sounds[path] = pygame.mixer.Sound(path)
+        return sound
+    def unload_sound(self, path):
+        self.sounds.pop(path, None)
+    def remove_variants(self, path):
+        for key in [key for key in self.variants.items if key[0] == path]:
+            self.variants.bytes -= self.variants.items.pop(key)[1]
+    def get_image_variant(self, path, width, height, scale_x = 1, scale_y = 1, rotation = 0, alpha = 255):
+        rotation = round(rotation / self.angle_step) * self.angle_step % 360
+        key = (path, width, height, scale_x, scale_y, rotation, alpha)
+        variant = self.variants.get(key)
+        if variant != None:
+            return variant
+
+        image = self.load_image(path)
+        size = (int(width * scale_x), int(height * scale_y))
+        variant = image
+        if size != image.get_size():
+            if image.get_bitsize() in (24, 32):
+                variant = pygame.transform.smoothscale(image, size)
+            else:
+                variant = pygame.transform.scale(image, size)
+        if rotation != 0:
+            variant = pygame.transform.rotate(variant, rotation)
+        if alpha != 255:
+            if variant is image:
+                variant = image.copy()
+            variant.set_alpha(alpha)
+        # the base image is already accounted in images
+        return self.variants.set(key, variant, 0 if variant is image else get_surface_bytes(variant))
+    def get_font(self, family, size):
+        font = self.fonts.get((family, size))
+        if font == None:
+            # SysFont scans the system fonts, so every font is created once
+            if os.path.isfile(family):
+                font = pygame.font.Font(family, size)
+            else:
+                font = pygame.font.SysFont(family, size)
+            self.fonts[(family, size)] = font
+        return font
+    def render_text(self, text, family, size, color, alpha = 255):
+        key = (text, family, size, tuple(color), alpha)
+        surface = self.texts.get(key)
+        if surface != None:
+            return surface
+        font = self.get_font(family, size)
+        lines = text.split('\n')
+        if len(lines) == 1:
+            surface = font.render(text, True, color)
+        else:
+            rendered = [font.render(line, True, color) for line in lines]
+            surface = pygame.Surface((max(line.get_width() for line in rendered), font.get_linesize() * len(rendered)), pygame.SRCALPHA)
+            surface.blits([(line, (0, index * font.get_linesize())) for index, line in enumerate(rendered)], False)
+        if alpha != 255:
+            surface = surface.convert_alpha() if pygame.display.get_surface() != None else surface
+            surface.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        return self.texts.set(key, surface, get_surface_bytes(surface))
+    def get_glyph(self, char, family, size, color, alpha = 255):
+        key = (family, size, tuple(color), alpha)
+        entry = self.glyph_atlases.get(key)
+        if entry == None:
+            entry = self.glyph_atlases[key] = (Atlas(512, 512), {})
+        atlas, glyphs = entry
+        glyph = glyphs.get(char)
+        if glyph == None:
+            glyph = self.get_font(family, size).render(char, True, color).convert_alpha()
+            if alpha != 255:
+                glyph.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+            # glyphs that don't fit in the atlas are kept as their own surface
+            if atlas.add(char, glyph) != None:
+                glyph = atlas.get_image(char)
+            glyphs[char] = glyph
+        return glyph
+    def set_max_variant_bytes(self, max_bytes):
+        self.variants.set_max_bytes(max_bytes)
+    def get_memory_usage(self):
+        images_bytes = sum(get_surface_bytes(image) for image in self.images.values())
+        images_bytes += sum(get_surface_bytes(atlas.sheet) for atlas in set(self.atlases.values()))
+        texts_bytes = self.texts.bytes + sum(get_surface_bytes(atlas.sheet) for atlas, glyphs in self.glyph_atlases.values())
+        sounds_bytes = sum(get_sound_bytes(sound) for sound in self.sounds.values()) if pygame.mixer.get_init() != None else 0
+        return {'images': images_bytes, 'variants': self.variants.bytes, 'texts': texts_bytes, 'sounds': sounds_bytes, 'total': images_bytes + self.variants.bytes + texts_bytes + sounds_bytes}
+    def clear(self):
+        self.fonts = {}
+        self.sounds = {}
+        self.texts.clear()
+        self.glyph_atlases = {}
+        self.images = {}
+        self.atlases = {}
+        self.converted = set()
+        self.variants.clear()
+
+assets = AssetStore()
+
 class GameObject:
+    bulk_collision = False
+    collidable = True
+    snapshot_fields = ('x', 'y', 'z', 'width', 'height', 'color', 'alpha', 'tags', 'gui', 'ignore_pause', 'active', 'visible', 'scale_x', 'scale_y', 'rotation')
+    # saved to files along with the snapshot fields, save_args are passed to the constructor when loading creates the game object
+    save_fields = ()
+    save_args = ()
     def __init__(self, x = 0, y = 0, z = 0, width = 10, height = 10, color = Colors['white'], alpha = 255, scale_x = 1, scale_y = 1, rotation = 0, tags = [], gui = False, ignore_pause = False, active = True, visible = True):
         self.id = str(uuid.uuid4())
         self.name = None
@@ -65,7 +454,7 @@ class GameObject:
         self.height = height
         self.color = color
         self.alpha = alpha
-        self.tags = tags
+        self.tags = set(tags)
         self.gui = gui
         self.ignore_pause = ignore_pause
         self.active = active
@@ -73,46 +462,118 @@ class GameObject:
         self.scale_x = scale_x
         self.scale_y = scale_y
         self.rotation = rotation
-        self.self_copy = copy.deepcopy(self)
+        self.dirty = True
+        self.render_key = None
+        self.initial_state = {}
+        self.save_initial_state()
+    def save_initial_state(self):
+        # fields set by subclasses after super().__init__ are saved when the game object is added to a scene
+        if len(self.initial_state) == len(self.snapshot_fields):
+            return
+        for field, value in take_snapshot(self, self.snapshot_fields).items():
+            self.initial_state.setdefault(field, value)
+    def snapshot(self):
+        return take_snapshot(self, self.snapshot_fields)
+    def get_save_state(self):
+        state = self.__dict__
+        return {field: state[field] for field in self.snapshot_fields + self.save_fields if field in state}
+    def restore(self, snapshot, copy = True):
+        indexed = self.scene != None and self.scene.has_game_object(self)
+        if indexed == True:
+            self.scene.unindex_tags(self)
+        for field, value in snapshot.items():
+            setattr(self, field, copy_field(value) if copy == True else value)
+        self.dirty = True
+        if indexed == True:
+            self.scene.z_order.update(self)
+            self.scene.index_tags(self)
     def reset(self):
-        self.self_copy_reset = copy.deepcopy(self.self_copy)
-        self.self_copy_reset.name = self.name
-        self.self_copy_reset.scene = self.scene
-        self.__dict__.update(self.self_copy_reset.__dict__)
+        self.restore(self.initial_state)
 
         if hasattr(self, 'load'): self.load()
-    def drawing(self):
-        self.surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.surface.set_alpha(self.alpha)
+    def get_zoom(self):
+        if self.gui == True or self.scene == None or self.scene.game == None:
+            return 1.0
+        return self.scene.game.camera.zoom
+    def get_render_key(self):
+        return (self.width, self.height, tuple(self.color), self.alpha, self.scale_x, self.scale_y, self.rotation, self.get_zoom())
+    def render(self):
+        # Rebuild the cached surface only when a visual property changed
+        render_key = self.get_render_key()
+        if self.dirty == False and render_key == self.render_key:
+            return self.rotated_surface
+        self.render_key = render_key
+        self.dirty = False
+
+        if self.alpha == 255 and len(self.color) == 3 and self.rotation % 360 == 0:
+            self.surface = pygame.Surface((self.width, self.height))
+        else:
+            self.surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+            self.surface.set_alpha(self.alpha)
         self.surface.fill(self.color)
 
-        self.drawing_x = self.x
-        self.drating_y = self.y
-        if self.gui == False:
-            self.drawing_x -= self.scene.game.camera.x
-            self.drating_y -= self.scene.game.camera.y
+        zoom = self.get_zoom()
+        self.scaled_surface = self.surface
+        if zoom != 1:
+            # rounded up so zoomed neighbours don't leave gaps between them
+            self.scaled_surface = pygame.transform.scale(self.surface, (math.ceil(self.width * self.scale_x * zoom), math.ceil(self.height * self.scale_y * zoom)))
+        elif self.scale_x != 1 or self.scale_y != 1:
+            self.scaled_surface = pygame.transform.scale(self.surface, (self.width * self.scale_x, self.height * self.scale_y))
+        self.rotated_surface = self.scaled_surface
+        if self.rotation % 360 != 0:
+            self.rotated_surface = pygame.transform.rotate(self.scaled_surface, self.rotation)
+        return self.rotated_surface
+    def drawing(self):
+        self.drawing_x, self.drating_y = self.get_screen_position()
 
-        self.scaled_surface = pygame.transform.scale(self.surface, (self.width * self.scale_x, self.height * self.scale_y))
-        self.rotated_surface = pygame.transform.rotate(self.scaled_surface, self.rotation)
-        self.scene.game.screen.blit(self.rotated_surface, (self.drawing_x, self.drating_y))
+        if self.alpha == 0:
+            return
+        self.scene.game.blit(self.render(), (self.drawing_x, self.drating_y))
+    def get_screen_position(self, x = None, y = None):
+        x = self.x if x == None else x
+        y = self.y if y == None else y
+        if self.gui == True:
+            return (x, y)
+        return self.scene.game.camera.world_to_screen(x, y)
+    def get_screen_rect(self):
+        return pygame.Rect(self.get_screen_position(), self.render().get_size())
+    def get_draw_state(self):
+        return self.get_render_key()
     def add_tag(self, tag):
-        self.tags.append(tag)
+        self.tags.add(tag)
+        if self.scene != None and self.scene.has_game_object(self):
+            self.scene.index_tag(self, tag)
         return tag
     def remove_tag(self, tag):
         self.tags.remove(tag)
+        if self.scene != None and self.scene.has_game_object(self):
+            self.scene.unindex_tag(self, tag)
         return tag
+    def set_tags(self, tags):
+        for tag in self.tags - set(tags):
+            self.remove_tag(tag)
+        for tag in set(tags) - self.tags:
+            self.add_tag(tag)
     def has_tag(self, tag):
         return tag in self.tags
     def get_tags(self):
         return self.tags
     def set_z(self, z):
         self.z = z
-        self.scene.sort_game_objects_by_z()
+        if self.scene != None and self.scene.has_game_object(self):
+            self.scene.z_order.update(self)
     def set_size(self, width, height):
         self.width = width
         self.height = height
+        self.dirty = True
+    def get_bounds(self):
+        # covers the collision box and everything drawing() draws
+        width, height = get_rotated_size(self.width * self.scale_x, self.height * self.scale_y, self.rotation)
+        return (self.x, self.y, max(self.width, width), max(self.height, height))
 
 class Image(GameObject):
+    snapshot_fields = GameObject.snapshot_fields + ('image_path', 'image_width', 'image_height', 'image_alpha', 'image_offset_x', 'image_offset_y', 'image_scale_x', 'image_scale_y', 'image_rotation')
+    save_args = ('image_path', 'image_width', 'image_height')
     def __init__(self, x = 0, y = 0, z = 0, width = 10, height = 10, color = Colors['white'], alpha = 255, scale_x = 1, scale_y = 1, rotation = 0, tags = [], gui = False, ignore_pause = False, active = True, visible = True, image_path = '', image_width = None, image_height = None, image_alpha = 255, image_offset_x = 0, image_offset_y = 0, image_scale_x = 1, image_scale_y = 1, image_rotation = 0):
         super().__init__(x=x, y=y , z=z, width=width, height=height, color=color, alpha=alpha, scale_x=scale_x, scale_y=scale_y, rotation=rotation, tags=tags, gui=gui, ignore_pause=ignore_pause, active=active, visible=visible)
         self.image_offset_x = image_offset_x
@@ -122,26 +583,39 @@ class Image(GameObject):
         self.image_scale_y = image_scale_y
         self.image_rotation = image_rotation
         self.load_image(image_path, image_width, image_height)
+    def get_image_variant(self):
+        # every zoom level gets its own cached variant
+        zoom = self.get_zoom()
+        return assets.get_image_variant(self.image_path, self.image_width, self.image_height, self.image_scale_x * zoom, self.image_scale_y * zoom, self.image_rotation, self.image_alpha)
     def drawing_image(self):
-        self.image_drawing_x = self.x
-        self.image_drawing_y = self.y
-        if self.gui == False:
-            self.image_drawing_x -= self.scene.game.camera.x
-            self.image_drawing_y -= self.scene.game.camera.y
-        self.scaled_image_scale = pygame.transform.smoothscale(self.scaled_image.convert_alpha(), (self.image_width * self.image_scale_x, self.image_height * self.image_scale_y))
-        self.rotated_image = pygame.transform.rotate(self.scaled_image_scale, self.image_rotation)
-        self.scene.game.screen.blit(self.rotated_image, (self.image_drawing_x + self.image_offset_x, self.image_drawing_y + self.image_offset_y, self.image_width, self.image_height))
+        self.image_drawing_x, self.image_drawing_y = self.get_screen_position(self.x + self.image_offset_x, self.y + self.image_offset_y)
+        self.rotated_image = self.get_image_variant()
+        self.scene.game.blit(self.rotated_image, (self.image_drawing_x, self.image_drawing_y))
+    def get_bounds(self):
+        width, height = get_rotated_size(self.image_width * self.image_scale_x, self.image_height * self.image_scale_y, self.image_rotation)
+        return get_union_bounds(super().get_bounds(), (self.x + self.image_offset_x, self.y + self.image_offset_y, width, height))
+    def get_screen_rect(self):
+        position = self.get_screen_position(self.x + self.image_offset_x, self.y + self.image_offset_y)
+        return super().get_screen_rect().union(pygame.Rect(position, self.get_image_variant().get_size()))
+    def restore(self, snapshot, copy = True):
+        super().restore(snapshot, copy)
+        if 'image_path' in snapshot:
+            self.image = assets.load_image(self.image_path)
+            self.image_rect = self.image.get_rect()
+            self.image_original_width = self.image_rect[2]
+            self.image_original_height = self.image_rect[3]
+            self.scaled_image = assets.get_image_variant(self.image_path, self.image_width, self.image_height)
+    def get_draw_state(self):
+        return (self.get_render_key(), self.image_path, self.image_width, self.image_height, self.image_scale_x, self.image_scale_y, self.image_rotation, self.image_alpha, self.image_offset_x, self.image_offset_y)
     def load_image(self, image_path, image_width = None, image_height = None):
         self.image_path = image_path
-        self.image = pygame.image.load(self.image_path)
+        self.image = assets.load_image(self.image_path)
         self.image_rect = self.image.get_rect()
         self.image_original_width = self.image_rect[2]
         self.image_original_height = self.image_rect[3]
         self.set_image_size(image_width, image_height)
-        self.scaled_image.set_alpha(self.image_alpha)
     def set_image_alpha(self, alpha):
         self.image_alpha = alpha
-        self.scaled_image.set_alpha(self.image_alpha)
     def set_image_size(self, image_width = None, image_height = None):
         self.image_width = image_width
         self.image_height = image_height
@@ -149,11 +623,11 @@ class Image(GameObject):
             self.image_width = self.image_original_width
         if self.image_height == None:
             self.image_height = self.image_original_height
-        self.scaled_image = pygame.transform.scale(self.image, (self.image_width, self.image_height))
+        self.scaled_image = assets.get_image_variant(self.image_path, self.image_width, self.image_height)
     def set_image_width(self, width):
-        self.set_image_size(width=width, height=None)
+        self.set_image_size(image_width=width, image_height=None)
     def set_image_height(self, height):
-        self.set_image_size(width=None, height=height)
+        self.set_image_size(image_width=None, image_height=height)
     def set_image_offset(self, image_offset_x = None, image_offset_y = None):
         if image_offset_x != None:
             self.image_offset_x = image_offset_x
@@ -166,8 +640,9 @@ class Image(GameObject):
 
 
 class Text(GameObject):
-    def __init__(self, text = 'Text', font_size = 10, font_color = Colors['white'], font_alpha = 255, font_family = 'Arial', text_offset_x = 0, text_offset_y = 0):
-        super().__init__()
+    snapshot_fields = GameObject.snapshot_fields + ('text', 'font_size', 'font_color', 'font_alpha', 'font_family', 'text_offset_x', 'text_offset_y', 'glyphs')
+    def __init__(self, text = 'Text', font_size = 10, font_color = Colors['white'], font_alpha = 255, font_family = 'Arial', text_offset_x = 0, text_offset_y = 0, glyphs = False, x = 0, y = 0, z = 0, width = 10, height = 10, color = Colors['white'], alpha = 0, tags = [], gui = False, ignore_pause = False, active = True, visible = True):
+        super().__init__(x=x, y=y, z=z, width=width, height=height, color=color, alpha=alpha, tags=tags, gui=gui, ignore_pause=ignore_pause, active=active, visible=visible)
         self.text = text
         self.font_size = font_size
         self.font_color = font_color
@@ -175,24 +650,772 @@ class Text(GameObject):
         self.font_family = font_family
         self.text_offset_x = text_offset_x
         self.text_offset_y = text_offset_y
+        # glyphs draws each character from a glyph atlas, for text that changes every frame
+        self.glyphs = glyphs
+    def set_text(self, text):
+        self.text = text
+    def get_font_size(self):
+        # zoomed text is rendered at the zoomed size so it stays sharp
+        return max(1, round(self.font_size * self.get_zoom()))
+    def get_text_size(self):
+        font = assets.get_font(self.font_family, self.font_size)
+        lines = str(self.text).split('\n')
+        return (max(font.size(line)[0] for line in lines), font.get_linesize() * len(lines) if len(lines) > 1 else font.size(lines[0])[1])
+    def drawing_text(self):
+        if self.font_alpha == 0:
+            return
+        game = self.scene.game
+        self.text_drawing_x, self.text_drawing_y = self.get_screen_position(self.x + self.text_offset_x, self.y + self.text_offset_y)
+        if self.glyphs == False:
+            game.blit(assets.render_text(str(self.text), self.font_family, self.get_font_size(), self.font_color, self.font_alpha), (self.text_drawing_x, self.text_drawing_y))
+            return
+
+        font_size = self.get_font_size()
+        line_size = assets.get_font(self.font_family, font_size).get_linesize()
+        blits = []
+        x, y = self.text_drawing_x, self.text_drawing_y
+        for char in str(self.text):
+            if char == '\n':
+                x = self.text_drawing_x
+                y += line_size
+                continue
+            glyph = assets.get_glyph(char, self.font_family, font_size, self.font_color, self.font_alpha)
+            blits.append((glyph, (x, y)))
+            x += glyph.get_width()
+        game.blit_many(blits)
+    def get_bounds(self):
+        width, height = self.get_text_size()
+        return get_union_bounds(super().get_bounds(), (self.x + self.text_offset_x, self.y + self.text_offset_y, width, height))
+    def get_screen_rect(self):
+        position = self.get_screen_position(self.x + self.text_offset_x, self.y + self.text_offset_y)
+        width, height = self.get_text_size()
+        zoom = self.get_zoom()
+        # glyphs can be a bit wider than the kerned text
+        text_rect = pygame.Rect(position, (math.ceil(width * zoom) + len(str(self.text)), math.ceil(height * zoom) + 1))
+        return super().get_screen_rect().union(text_rect)
+    def get_draw_state(self):
+        return (self.get_render_key(), str(self.text), self.font_size, tuple(self.font_color), self.font_alpha, self.font_family, self.text_offset_x, self.text_offset_y, self.glyphs)
+
+class CellGrid(GameObject):
+    snapshot_fields = GameObject.snapshot_fields + ('board',)
+    save_fields = ('rows', 'columns', 'cell_size', 'wrap')
+    save_args = ('rows', 'columns', 'cell_size')
+    def __init__(self, rows = 100, columns = 100, cell_size = 4, birth = (3,), survive = (2, 3), wrap = False, alive_color = Colors['white'], dead_color = None, x = 0, y = 0, z = 0, tags = [], gui = False, ignore_pause = False, active = True, visible = True):
+        if numpy == None:
+            raise ImportError('CellGrid requires numpy')
+        super().__init__(x=x, y=y, z=z, width=columns * cell_size, height=rows * cell_size, alpha=0, tags=tags, gui=gui, ignore_pause=ignore_pause, active=active, visible=visible)
+        self.rows = rows
+        self.columns = columns
+        self.cell_size = cell_size
+        self.wrap = wrap
+        self.alive_color = alive_color
+        self.dead_color = dead_color
+        self.steps_per_update = 1
+        self.board = numpy.zeros((rows, columns), dtype=numpy.uint8)
+        self.grid_surface = None
+        self.grid_scaled_surface = None
+        self.grid_dirty = True
+        self.set_rule(birth, survive)
+    def set_rule(self, birth, survive):
+        self.birth = tuple(birth)
+        self.survive = tuple(survive)
+        # values of (3x3 sum + cell * 9) that leave the cell alive, dead cells use 0-8 and alive cells 10-18
+        self.rule_values = [neighbors for neighbors in self.birth] + [10 + neighbors for neighbors in self.survive]
+    def set_colors(self, alive_color, dead_color = None):
+        self.alive_color = alive_color
+        self.dead_color = dead_color
+        self.grid_surface = None
+        self.grid_dirty = True
+    def restore(self, snapshot, copy = True):
+        super().restore(snapshot, copy)
+        self.grid_surface = None
+        self.grid_dirty = True
+    def randomize(self, density = 0.5):
+        self.board = (numpy.random.random((self.rows, self.columns)) < density).view(numpy.uint8)
+        self.grid_dirty = True
+    def clear(self):
+        self.board.fill(0)
+        self.grid_dirty = True
+    def get_cell(self, row, column):
+        return int(self.board[row, column])
+    def set_cell(self, row, column, alive = 1):
+        self.board[row, column] = alive
+        self.grid_dirty = True
+    def get_cell_at(self, x, y):
+        row = int((y - self.y) // self.cell_size)
+        column = int((x - self.x) // self.cell_size)
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return (row, column)
+        return None
+    def get_area_sum(self):
+        padded = numpy.pad(self.board, 1, mode='wrap' if self.wrap == True else 'constant')
+        rows_sum = padded[:-2] + padded[1:-1] + padded[2:]
+        return rows_sum[:, :-2] + rows_sum[:, 1:-1] + rows_sum[:, 2:]
+    def count_neighbors(self):
+        return self.get_area_sum() - self.board
+    def step(self, steps = 1):
+        for _ in range(steps):
+            area_sum = self.get_area_sum()
+            area_sum += self.board * numpy.uint8(9)
+            board = numpy.zeros(area_sum.shape, dtype=bool)
+            for value in self.rule_values:
+                board |= area_sum == value
+            self.board = board.view(numpy.uint8)
+        self.grid_dirty = True
+    def update(self):
+        self.step(self.steps_per_update)
+    def render_grid(self):
+        if self.grid_surface == None:
+            if self.dead_color == None:
+                self.grid_surface = pygame.Surface((self.columns, self.rows), pygame.SRCALPHA)
+            else:
+                self.grid_surface = pygame.Surface((self.columns, self.rows))
+            if pygame.display.get_surface() != None:
+                self.grid_surface = self.grid_surface.convert_alpha() if self.dead_color == None else self.grid_surface.convert()
+        dead = numpy.uint32(self.grid_surface.map_rgb(self.dead_color) & 0xFFFFFFFF if self.dead_color != None else 0)
+        alive = numpy.uint32(self.grid_surface.map_rgb(self.alive_color) & 0xFFFFFFFF)
+        pixels = pygame.surfarray.pixels2d(self.grid_surface)
+        # packed colors wrap around, so dead + board * (alive - dead) is alive for live cells
+        numpy.multiply(self.board.T, alive - dead, out=pixels, casting='unsafe')
+        pixels += dead
+        del pixels
+
+        size = self.get_grid_size()
+        if size == (self.columns, self.rows):
+            return self.grid_surface
+        if self.grid_scaled_surface == None or self.grid_scaled_surface.get_size() != size:
+            self.grid_scaled_surface = pygame.Surface(size, self.grid_surface.get_flags(), self.grid_surface)
+        return pygame.transform.scale(self.grid_surface, size, self.grid_scaled_surface)
+    def get_grid_size(self):
+        zoom = self.get_zoom()
+        return (math.ceil(self.width * zoom), math.ceil(self.height * zoom))
+    def get_screen_rect(self):
+        return pygame.Rect(self.get_screen_position(), self.get_grid_size())
+    def get_draw_state(self):
+        if self.grid_dirty == True:
+            return None
+        return (self.get_grid_size(), self.alive_color, self.dead_color)
+    def drawing(self):
+        self.drawing_x, self.drating_y = self.get_screen_position()
+
+        if self.grid_dirty == True or self.grid_rendered_surface.get_size() != self.get_grid_size():
+            self.grid_rendered_surface = self.render_grid()
+            self.grid_dirty = False
+        self.scene.game.blit(self.grid_rendered_surface, (self.drawing_x, self.drating_y))
+
+def get_ranges(starts, ends):
+    # expands [start, end) ranges into (range number, position) arrays
+    counts = numpy.maximum(ends - starts, 0)
+    owners = numpy.repeat(numpy.arange(len(starts)), counts)
+    positions = numpy.arange(len(owners)) - numpy.repeat(numpy.cumsum(counts) - counts, counts) + numpy.repeat(starts, counts)
+    return (owners, positions)
+
+class EntityArray(GameObject):
+    bulk_collision = True
+    snapshot_fields = GameObject.snapshot_fields + ('columns', 'capacity', 'size', 'free')
+    save_fields = ('column_defaults',)
+    save_args = ('capacity',)
+    def __init__(self, capacity = 1024, columns = {}, entity_width = 8, entity_height = 8, x = 0, y = 0, z = 0, color = Colors['white'], tags = [], gui = False, ignore_pause = False, active = True, visible = True):
+        if numpy == None:
+            raise ImportError('EntityArray requires numpy')
+        super().__init__(x=x, y=y, z=z, width=0, height=0, color=color, tags=tags, gui=gui, ignore_pause=ignore_pause, active=active, visible=visible)
+        self.entity_width = entity_width
+        self.entity_height = entity_height
+        self.capacity = capacity
+        # entities are rows in these arrays, only the first size rows are used
+        self.size = 0
+        self.free = []
+        self.columns = {}
+        self.column_defaults = {}
+        self.add_column('x', numpy.float32)
+        self.add_column('y', numpy.float32)
+        self.add_column('z', numpy.int32)
+        self.add_column('width', numpy.float32, entity_width)
+        self.add_column('height', numpy.float32, entity_height)
+        self.add_column('speed_x', numpy.float32)
+        self.add_column('speed_y', numpy.float32)
+        self.add_column('color', numpy.uint8, color[:3], 3)
+        self.add_column('alive', bool, False)
+        self.add_column('active', bool, True)
+        self.add_column('visible', bool, True)
+        for name, dtype in columns.items():
+            self.add_column(name, dtype)
+    def __len__(self):
+        return self.size - len(self.free)
+    def add_column(self, name, dtype, default = 0, width = None):
+        shape = (self.capacity,) if width == None else (self.capacity, width)
+        self.columns[name] = numpy.empty(shape, dtype=dtype)
+        self.columns[name][:] = default
+        self.column_defaults[name] = default
+        return self.columns[name]
+    def restore(self, snapshot, copy = True):
+        super().restore(snapshot, copy)
+        # columns added after the constructor, like the custom columns of a loaded save, grow with their default
+        for name in self.columns:
+            self.column_defaults.setdefault(name, 0)
+    def get_column(self, name):
+        # views are invalid after the array grows, get them again every frame
+        return self.columns[name][:self.size]
+    def grow(self, capacity):
+        for name, column in self.columns.items():
+            grown = numpy.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.capacity] = column
+            grown[self.capacity:] = self.column_defaults[name]
+            self.columns[name] = grown
+        self.capacity = capacity
+    def set_entity(self, index, values):
+        for name, value in values.items():
+            self.columns[name][index] = value
+    def spawn(self, x = 0, y = 0, **values):
+        if self.free:
+            index = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.grow(self.capacity * 2)
+            index = self.size
+            self.size += 1
+        self.set_entity(index, self.column_defaults)
+        self.set_entity(index, values)
+        self.columns['x'][index] = x
+        self.columns['y'][index] = y
+        self.columns['alive'][index] = True
+        return index
+    def spawn_many(self, count, **values):
+        reused = self.free[-count:] if count > 0 else []
+        del self.free[len(self.free) - len(reused):]
+        added = count - len(reused)
+        if self.size + added > self.capacity:
+            capacity = self.capacity
+            while capacity < self.size + added:
+                capacity *= 2
+            self.grow(capacity)
+        indices = numpy.concatenate((numpy.array(reused, dtype=numpy.intp), numpy.arange(self.size, self.size + added)))
+        self.size += added
+        self.set_entity(indices, self.column_defaults)
+        self.set_entity(indices, values)
+        self.columns['alive'][indices] = True
+        return indices
+    def kill(self, index):
+        if self.columns['alive'][index] == True:
+            self.columns['alive'][index] = False
+            self.free.append(int(index))
+    def kill_many(self, indices):
+        indices = numpy.asarray(indices)
+        if indices.dtype == bool:
+            indices = numpy.flatnonzero(indices)
+        indices = numpy.unique(indices)
+        indices = indices[self.columns['alive'][indices]]
+        self.columns['alive'][indices] = False
+        self.free.extend(indices.tolist())
+    def clear(self):
+        self.size = 0
+        self.free = []
+        self.columns['alive'][:] = False
+    def get_alive(self):
+        return numpy.flatnonzero(self.columns['alive'][:self.size])
+    def get_bounds(self):
+        alive = self.columns['alive'][:self.size]
+        if not alive.any():
+            return (self.x, self.y, 0, 0)
+        x = self.columns['x'][:self.size][alive]
+        y = self.columns['y'][:self.size][alive]
+        left = float(x.min())
+        top = float(y.min())
+        right = float((x + self.columns['width'][:self.size][alive]).max())
+        bottom = float((y + self.columns['height'][:self.size][alive]).max())
+        return (self.x + left, self.y + top, right - left, bottom - top)
+    def get_in_area(self, mask, x, y, width, height):
+        size = self.size
+        entities_x = self.columns['x'][:size] + self.x
+        entities_y = self.columns['y'][:size] + self.y
+        return numpy.flatnonzero(
+            mask &
+            (entities_x + self.columns['width'][:size] > x) & (entities_x < x + width) &
+            (entities_y + self.columns['height'][:size] > y) & (entities_y < y + height)
+        )
+    def get_collisions(self, x, y, width, height):
+        return self.get_in_area(self.columns['alive'][:self.size] & self.columns['active'][:self.size], x, y, width, height)
+    def get_visible(self, x, y, width, height):
+        # inactive entities are still drawn, active only stops updates and collisions
+        return self.get_in_area(self.columns['alive'][:self.size] & self.columns['visible'][:self.size], x, y, width, height)
+    def get_pairs(self):
+        # rows as tall as the tallest entity, sorted by (row, x) so overlaps are a short range in the same or next row
+        indices = numpy.flatnonzero(self.columns['alive'][:self.size] & self.columns['active'][:self.size])
+        if len(indices) < 2:
+            return (indices[:0], indices[:0])
+        x = self.columns['x'][indices].astype(numpy.float64)
+        y = self.columns['y'][indices].astype(numpy.float64)
+        width = self.columns['width'][indices].astype(numpy.float64)
+        height = self.columns['height'][indices].astype(numpy.float64)
+        rows = numpy.floor((y - y.min()) / max(float(height.max()), 1))
+        span = float(x.max() - x.min() + width.max()) + 1
+        keys = rows * span + (x - x.min())
+        order = numpy.argsort(keys, kind='stable')
+        keys = keys[order]
+        right = keys + width[order]
+        first, second = get_ranges(numpy.arange(1, len(keys) + 1), numpy.searchsorted(keys, right, side='left'))
+        first_next, second_next = get_ranges(numpy.searchsorted(keys, keys + span - width.max(), side='right'), numpy.searchsorted(keys, right + span, side='left'))
+        a = order[numpy.concatenate((first, first_next))]
+        b = order[numpy.concatenate((second, second_next))]
+        overlap = (x[a] + width[a] > x[b]) & (x[a] < x[b] + width[b]) & (y[a] + height[a] > y[b]) & (y[a] < y[b] + height[b])
+        return (indices[a[overlap]], indices[b[overlap]])
+    def update(self):
+        delta_time = self.scene.game.delta_time
+        moving = self.columns['alive'][:self.size] & self.columns['active'][:self.size]
+        self.columns['x'][:self.size][moving] += self.columns['speed_x'][:self.size][moving] * delta_time
+        self.columns['y'][:self.size][moving] += self.columns['speed_y'][:self.size][moving] * delta_time
+    def get_screen_rect(self):
+        x, y, width, height = self.get_bounds()
+        zoom = self.get_zoom()
+        x, y = self.get_screen_position(x, y)
+        return pygame.Rect(x, y, math.ceil(width * zoom) + 1, math.ceil(height * zoom) + 1)
+    def get_draw_state(self):
+        # entities can change without the array knowing it
+        return None
+    def drawing(self):
+        game = self.scene.game
+        if self.gui == True:
+            area = (0, 0, game.width, game.height)
+        else:
+            area = game.camera.get_viewport()
+        offset_x, offset_y = self.get_screen_position()
+        zoom = self.get_zoom()
+        if game.culling == True:
+            indices = self.get_visible(*area)
+        else:
+            indices = numpy.flatnonzero(self.columns['alive'][:self.size] & self.columns['visible'][:self.size])
+        z = self.columns['z'][indices]
+        if len(z) > 0 and z.min() != z.max():
+            indices = indices[numpy.argsort(z, kind='stable')]
+
+        # whole pixel edges, so zoomed neighbours don't overlap or leave gaps
+        left = numpy.floor(self.columns['x'][indices] * zoom + offset_x)
+        top = numpy.floor(self.columns['y'][indices] * zoom + offset_y)
+        width = (numpy.floor((self.columns['x'][indices] + self.columns['width'][indices]) * zoom + offset_x) - left).tolist()
+        height = (numpy.floor((self.columns['y'][indices] + self.columns['height'][indices]) * zoom + offset_y) - top).tolist()
+        x = left.tolist()
+        y = top.tolist()
+        colors = self.columns['color'][indices].tolist()
+        game.flush_blits()
+        fill = game.screen.fill
+        for index in range(len(x)):
+            fill(colors[index], (x[index], y[index], width[index], height[index]))
+
+class ParticleEmitter(GameObject):
+    collidable = False
+    snapshot_fields = GameObject.snapshot_fields + ('count', 'positions', 'velocities', 'lives', 'max_lives', 'sizes', 'colors', 'rate', 'emitting')
+    save_fields = ('capacity',)
+    save_args = ('capacity',)
+    def __init__(self, capacity = 10000, rate = 0, life = (0.5, 1.0), speed = (50, 100), angle = (0, 360), size = 2, color = Colors['white'], end_color = None, gravity = (0, 0), drag = 0, fade = True, emitting = True, x = 0, y = 0, z = 0, width = 0, height = 0, tags = [], gui = False, ignore_pause = False, active = True, visible = True):
+        if numpy == None:
+            raise ImportError('ParticleEmitter requires numpy')
+        super().__init__(x=x, y=y, z=z, width=width, height=height, color=color, tags=tags, gui=gui, ignore_pause=ignore_pause, active=active, visible=visible)
+        self.capacity = capacity
+        self.rate = rate
+        self.life = life
+        self.speed = speed
+        self.angle = angle
+        self.size = size
+        self.end_color = end_color
+        self.gravity = gravity
+        self.drag = drag
+        self.fade = fade
+        self.emitting = emitting
+        self.emit_accumulator = 0.0
+        self.alpha_levels = 16
+        self.dot_surfaces = {}
+        # alive particles are always the first count rows
+        self.count = 0
+        self.positions = numpy.zeros((capacity, 2), dtype=numpy.float32)
+        self.velocities = numpy.zeros((capacity, 2), dtype=numpy.float32)
+        self.lives = numpy.zeros(capacity, dtype=numpy.float32)
+        self.max_lives = numpy.ones(capacity, dtype=numpy.float32)
+        self.sizes = numpy.zeros(capacity, dtype=numpy.float32)
+        self.colors = numpy.zeros((capacity, 3), dtype=numpy.uint8)
+    def __len__(self):
+        return self.count
+    def get_range(self, value, count):
+        # a number or a (min, max) range
+        if isinstance(value, (tuple, list)):
+            return numpy.random.uniform(value[0], value[1], count)
+        return numpy.full(count, value, dtype=numpy.float32)
+    def emit(self, count, x = None, y = None):
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return 0
+        start, end = self.count, self.count + count
+        x = self.x if x == None else x
+        y = self.y if y == None else y
+        self.positions[start:end, 0] = x + numpy.random.uniform(0, self.width, count) if self.width > 0 else x
+        self.positions[start:end, 1] = y + numpy.random.uniform(0, self.height, count) if self.height > 0 else y
+        angles = numpy.radians(self.get_range(self.angle, count))
+        speeds = self.get_range(self.speed, count)
+        self.velocities[start:end, 0] = numpy.cos(angles) * speeds
+        self.velocities[start:end, 1] = numpy.sin(angles) * speeds
+        self.lives[start:end] = self.max_lives[start:end] = self.get_range(self.life, count)
+        self.sizes[start:end] = self.get_range(self.size, count)
+        self.colors[start:end] = self.color[:3]
+        self.count = end
+        return count
+    def clear(self):
+        self.count = 0
+    def update(self):
+        delta_time = self.scene.game.delta_time
+        if self.emitting == True and self.rate > 0:
+            self.emit_accumulator += self.rate * delta_time
+            emit_count = int(self.emit_accumulator)
+            self.emit_accumulator -= emit_count
+            self.emit(emit_count)
+
+        count = self.count
+        velocities = self.velocities[:count]
+        if self.gravity[0] != 0 or self.gravity[1] != 0:
+            velocities += numpy.array(self.gravity, dtype=numpy.float32) * delta_time
+        if self.drag != 0:
+            velocities *= max(0.0, 1 - self.drag * delta_time)
+        self.positions[:count] += velocities * delta_time
+        self.lives[:count] -= delta_time
+
+        # dead particles are removed by moving the alive ones to the front
+        alive = self.lives[:count] > 0
+        alive_count = int(numpy.count_nonzero(alive))
+        if alive_count != count:
+            for array in (self.positions, self.velocities, self.lives, self.max_lives, self.sizes, self.colors):
+                array[:alive_count] = array[:count][alive]
+            self.count = alive_count
+    def get_bounds(self):
+        if self.count == 0:
+            return (self.x, self.y, self.width, self.height)
+        positions = self.positions[:self.count]
+        size = float(self.sizes[:self.count].max())
+        left, top = positions.min(axis=0)
+        right, bottom = positions.max(axis=0)
+        return get_union_bounds((self.x, self.y, self.width, self.height), (float(left), float(top), float(right - left) + size, float(bottom - top) + size))
+    def get_screen_rect(self):
+        x, y, width, height = self.get_bounds()
+        zoom = self.get_zoom()
+        x, y = self.get_screen_position(x, y)
+        return pygame.Rect(x, y, math.ceil(width * zoom) + 1, math.ceil(height * zoom) + 1)
+    def get_draw_state(self):
+        return None
+    def get_dot_surface(self, key):
+        surface = self.dot_surfaces.get(key)
+        if surface == None:
+            if len(self.dot_surfaces) >= 1024:
+                self.dot_surfaces = {}
+            size = key & 0xFF
+            alpha = (key >> 8) & 0xFF
+            color = ((key >> 32) & 0xFF, (key >> 24) & 0xFF, (key >> 16) & 0xFF)
+            surface = self.dot_surfaces[key] = pygame.Surface((size, size))
+            surface.fill(color)
+            if alpha != 255:
+                surface.set_alpha(alpha)
+        return surface
+    def drawing(self):
+        if self.count == 0:
+            return
+        game = self.scene.game
+        count = self.count
+        positions = self.positions[:count]
+        zoom = self.get_zoom()
+        area = (0, 0, game.width, game.height) if self.gui == True else game.camera.get_viewport()
+        visible = (
+            (positions[:, 0] + self.sizes[:count] > area[0]) & (positions[:, 0] < area[0] + area[2]) &
+            (positions[:, 1] + self.sizes[:count] > area[1]) & (positions[:, 1] < area[1] + area[3])
+        )
+        indices = numpy.flatnonzero(visible) if game.culling == True else numpy.arange(count)
+        if len(indices) == 0:
+            return
+
+        progress = self.lives[indices] / self.max_lives[indices]
+        colors = self.colors[indices].astype(numpy.int64)
+        if self.end_color != None:
+            end_color = numpy.array(self.end_color[:3], dtype=numpy.int64)
+            colors = end_color + ((colors - end_color) * progress[:, None]).astype(numpy.int64)
+        if self.fade == True:
+            # few alpha levels so particles share surfaces
+            alphas = numpy.ceil(progress * (self.alpha_levels - 1)).astype(numpy.int64) * 255 // (self.alpha_levels - 1)
+        else:
+            alphas = numpy.full(len(indices), 255, dtype=numpy.int64)
+        sizes = numpy.clip(numpy.ceil(self.sizes[indices] * zoom), 1, 255).astype(numpy.int64)
+        keys = (colors[:, 0] << 32) | (colors[:, 1] << 24) | (colors[:, 2] << 16) | (alphas << 8) | sizes
+        unique_keys, surface_indices = numpy.unique(keys, return_inverse=True)
+        surfaces = numpy.empty(len(unique_keys), dtype=object)
+        surfaces[:] = [self.get_dot_surface(key) for key in unique_keys.tolist()]
+
+        x, y = positions[indices, 0], positions[indices, 1]
+        if self.gui == False:
+            x, y = game.camera.world_to_screen(x, y)
+        game.blit_many(list(zip(surfaces[surface_indices].tolist(), zip(x.tolist(), y.tolist()))))
+
+class TileMap(GameObject):
+    bulk_collision = True
+    save_fields = ('tiles', 'tile_size', 'chunk_size')
+    save_args = ('tiles', 'tile_size', 'chunk_size')
+    def __init__(self, rows = 100, columns = 100, tile_size = 16, chunk_size = 16, tiles = None, tileset = None, tile_colors = {}, solid = None, max_chunk_bytes = 32 * 1024 * 1024, x = 0, y = 0, z = 0, tags = [], gui = False, ignore_pause = False, active = True, visible = True):
+        if numpy == None:
+            raise ImportError('TileMap requires numpy')
+        if tiles is not None:
+            rows, columns = tiles.shape
+        super().__init__(x=x, y=y, z=z, width=columns * tile_size, height=rows * tile_size, tags=tags, gui=gui, ignore_pause=ignore_pause, active=active, visible=visible)
+        self.rows = rows
+        self.columns = columns
+        self.tile_size = tile_size
+        self.chunk_size = chunk_size
+        # tile 0 is empty, tiles can be a numpy memmap so big maps are read from disk as chunks are drawn
+        self.tiles = tiles if tiles is not None else numpy.zeros((rows, columns), dtype=numpy.uint16)
+        self.solid = solid
+        self.tile_images = [None]
+        self.chunks = LRUCache(max_chunk_bytes)
+        self.chunk_versions = {}
+        self.version = 0
+        if tileset != None:
+            self.load_tileset(tileset)
+        for tile, color in tile_colors.items():
+            self.set_tile_color(tile, color)
+    def load_tileset(self, path):
+        # the tileset image is cut in tile_size squares, numbered from 1 left to right and top to bottom
+        image = assets.load_image(path)
+        for tile_y in range(0, image.get_height() - self.tile_size + 1, self.tile_size):
+            for tile_x in range(0, image.get_width() - self.tile_size + 1, self.tile_size):
+                self.tile_images.append(image.subsurface((tile_x, tile_y, self.tile_size, self.tile_size)))
+        self.invalidate()
+        return len(self.tile_images) - 1
+    def set_tile_image(self, tile, image):
+        while len(self.tile_images) <= tile:
+            self.tile_images.append(None)
+        self.tile_images[tile] = image
+        self.invalidate()
+    def set_tile_color(self, tile, color):
+        image = pygame.Surface((self.tile_size, self.tile_size), pygame.SRCALPHA if len(color) == 4 else 0)
+        image.fill(color)
+        self.set_tile_image(tile, image)
+    def invalidate(self, chunk = None):
+        self.version += 1
+        if chunk == None:
+            self.chunks.clear()
+            self.chunk_versions = {}
+        else:
+            # old surfaces of the chunk are never asked again and leave the cache
+            self.chunk_versions[chunk] = self.chunk_versions.get(chunk, 0) + 1
+    def restore(self, snapshot, copy = True):
+        super().restore(snapshot, copy)
+        if 'tiles' in snapshot:
+            self.rows, self.columns = self.tiles.shape
+            self.width = self.columns * self.tile_size
+            self.height = self.rows * self.tile_size
+            self.invalidate()
+    def get_tile(self, row, column):
+        return int(self.tiles[row, column])
+    def set_tile(self, row, column, tile):
+        self.tiles[row, column] = tile
+        self.invalidate((row // self.chunk_size, column // self.chunk_size))
+    def set_tiles(self, row, column, tiles):
+        tiles = numpy.asarray(tiles)
+        self.tiles[row:row + tiles.shape[0], column:column + tiles.shape[1]] = tiles
+        for chunk_row in range(row // self.chunk_size, (row + tiles.shape[0] - 1) // self.chunk_size + 1):
+            for chunk_column in range(column // self.chunk_size, (column + tiles.shape[1] - 1) // self.chunk_size + 1):
+                self.invalidate((chunk_row, chunk_column))
+    def get_cell_at(self, x, y):
+        row = int((y - self.y) // self.tile_size)
+        column = int((x - self.x) // self.tile_size)
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return (row, column)
+        return None
+    def get_tile_at(self, x, y):
+        cell = self.get_cell_at(x, y)
+        return 0 if cell == None else self.get_tile(*cell)
+    def get_solid_mask(self, tiles):
+        if self.solid == None:
+            return tiles != 0
+        return numpy.isin(tiles, list(self.solid))
+    def get_cell_range(self, x, y, width, height):
+        row0 = max(0, int((y - self.y) // self.tile_size))
+        column0 = max(0, int((x - self.x) // self.tile_size))
+        row1 = min(self.rows, math.ceil((y + height - self.y) / self.tile_size))
+        column1 = min(self.columns, math.ceil((x + width - self.x) / self.tile_size))
+        return (row0, column0, row1, column1)
+    def get_collisions(self, x, y, width, height):
+        # solid cells touching the rect, as a list of (row, column)
+        row0, column0, row1, column1 = self.get_cell_range(x, y, width, height)
+        if row0 >= row1 or column0 >= column1:
+            return []
+        rows, columns = numpy.nonzero(self.get_solid_mask(self.tiles[row0:row1, column0:column1]))
+        return list(zip((rows + row0).tolist(), (columns + column0).tolist()))
+    def is_solid_at(self, x, y):
+        tile = self.get_tile_at(x, y)
+        return tile != 0 if self.solid == None else tile in self.solid
+    def collides(self, game_object):
+        return len(self.get_collisions(game_object.x, game_object.y, game_object.width, game_object.height)) > 0
+    def __len__(self):
+        return self.rows * self.columns
+    def render_chunk(self, chunk_row, chunk_column):
+        row0, column0 = chunk_row * self.chunk_size, chunk_column * self.chunk_size
+        tiles = numpy.asarray(self.tiles[row0:row0 + self.chunk_size, column0:column0 + self.chunk_size])
+        surface = pygame.Surface((tiles.shape[1] * self.tile_size, tiles.shape[0] * self.tile_size), pygame.SRCALPHA)
+        if pygame.display.get_surface() != None:
+            surface = surface.convert_alpha()
+        rows, columns = numpy.nonzero(tiles)
+        blits = []
+        for row, column, tile in zip(rows.tolist(), columns.tolist(), tiles[rows, columns].tolist()):
+            image = self.tile_images[tile] if tile < len(self.tile_images) else None
+            if image != None:
+                blits.append((image, (column * self.tile_size, row * self.tile_size)))
+        surface.blits(blits, False)
+        return surface
+    def get_chunk(self, chunk_row, chunk_column, zoom = 1.0):
+        key = (chunk_row, chunk_column, self.chunk_versions.get((chunk_row, chunk_column), 0), zoom)
+        surface = self.chunks.get(key)
+        if surface == None:
+            if zoom == 1:
+                surface = self.render_chunk(chunk_row, chunk_column)
+            else:
+                chunk = self.get_chunk(chunk_row, chunk_column)
+                surface = pygame.transform.scale(chunk, (math.ceil(chunk.get_width() * zoom), math.ceil(chunk.get_height() * zoom)))
+            self.chunks.set(key, surface, get_surface_bytes(surface))
+        return surface
+    def get_screen_rect(self):
+        zoom = self.get_zoom()
+        return pygame.Rect(self.get_screen_position(), (math.ceil(self.width * zoom), math.ceil(self.height * zoom)))
+    def get_draw_state(self):
+        return (self.version, self.get_zoom())
+    def drawing(self):
+        game = self.scene.game
+        area = (0, 0, game.width, game.height) if self.gui == True else game.camera.get_viewport()
+        zoom = self.get_zoom()
+        chunk_pixels = self.chunk_size * self.tile_size
+        column0 = max(0, int((area[0] - self.x) // chunk_pixels))
+        row0 = max(0, int((area[1] - self.y) // chunk_pixels))
+        column1 = min(math.ceil(self.columns / self.chunk_size), math.ceil((area[0] + area[2] - self.x) / chunk_pixels))
+        row1 = min(math.ceil(self.rows / self.chunk_size), math.ceil((area[1] + area[3] - self.y) / chunk_pixels))
+        blits = []
+        for chunk_row in range(row0, row1):
+            for chunk_column in range(column0, column1):
+                position = self.get_screen_position(self.x + chunk_column * chunk_pixels, self.y + chunk_row * chunk_pixels)
+                blits.append((self.get_chunk(chunk_row, chunk_column, zoom), position))
+        game.blit_many(blits)
+    def save(self, path):
+        numpy.save(path, numpy.asarray(self.tiles))
+
+def load_tilemap(path, tile_size = 16, writable = False, **kwargs):
+    # tiles stay on disk and are read as chunks are drawn, changes are only written with writable
+    tiles = numpy.load(path, mmap_mode='r+' if writable == True else 'c')
+    return TileMap(tiles=tiles, tile_size=tile_size, **kwargs)
+
+class Mixer:
+    def __init__(self, channels = 16):
+        self.channels_count = channels
+        self.voices = []
+        self.music = None
+        self.plays = 0
+        self.stolen = 0
+        self.dropped = 0
+    def init(self):
+        if pygame.mixer.get_init() == None:
+            try:
+                pygame.mixer.init()
+            except pygame.error:
+                # no audio device, sounds are silent
+                return False
+        if len(self.voices) != self.channels_count:
+            self.set_channels(self.channels_count)
+        return True
+    def set_channels(self, count):
+        self.channels_count = count
+        if pygame.mixer.get_init() != None:
+            pygame.mixer.set_num_channels(count)
+            self.voices = (self.voices + [None] * count)[:count]
+    def get_channel(self, priority):
+        victim = None
+        for index, voice in enumerate(self.voices):
+            if voice == None or pygame.mixer.Channel(index).get_busy() == False:
+                self.voices[index] = None
+                return index
+            # the lowest priority voice is stolen, the oldest one between equal priorities
+            if voice[1] <= priority and (victim == None or voice[1:] < self.voices[victim][1:]):
+                victim = index
+        if victim != None:
+            pygame.mixer.Channel(victim).stop()
+            self.voices[victim] = None
+            self.stolen += 1
+        return victim
+    def play(self, sound, loops = 0):
+        if self.init() == False:
+            return None
+        index = self.get_channel(sound.priority)
+        if index == None:
+            self.dropped += 1
+            return None
+        channel = pygame.mixer.Channel(index)
+        channel.play(assets.get_sound(sound.sound_path), loops)
+        channel.set_volume(sound.volume / 100)
+        self.plays += 1
+        self.voices[index] = (sound, sound.priority, self.plays)
+        return channel
+    def play_music(self, sound, loops = 0):
+        if self.init() == False:
+            return False
+        # music is streamed from the file instead of being decoded into memory
+        pygame.mixer.music.load(sound.sound_path)
+        pygame.mixer.music.set_volume(sound.volume / 100)
+        pygame.mixer.music.play(loops)
+        self.music = sound
+        return True
+    def get_channels(self, sound):
+        return [pygame.mixer.Channel(index) for index, voice in enumerate(self.voices) if voice != None and voice[0] is sound and pygame.mixer.Channel(index).get_busy()]
+    def stop_all(self):
+        if pygame.mixer.get_init() != None:
+            pygame.mixer.stop()
+            pygame.mixer.music.stop()
+        self.voices = [None] * len(self.voices)
+        self.music = None
+
+mixer = Mixer()
 
 class Sound:
-    def __init__(self, sound_path, volume = 100):
+    def __init__(self, sound_path, volume = 100, priority = 0, loops = 0, stream = False):
         self.sound_path = sound_path
         self.volume = volume
+        # when every channel is busy a sound stops the lowest priority sound not above its own
+        self.priority = priority
+        self.loops = loops
+        self.stream = stream
     def play(self):
-        pass
+        if self.stream == True:
+            return mixer.play_music(self, self.loops)
+        return mixer.play(self, self.loops) != None
+    def is_music(self):
+        return self.stream == True and mixer.music is self and pygame.mixer.get_init() != None
+    def is_playing(self):
+        if self.is_music():
+            return pygame.mixer.music.get_busy()
+        return len(mixer.get_channels(self)) > 0
     def stop(self):
-        pass
+        if self.is_music():
+            pygame.mixer.music.stop()
+            mixer.music = None
+        for channel in mixer.get_channels(self):
+            channel.stop()
     def pause(self):
-        pass
+        if self.is_music():
+            pygame.mixer.music.pause()
+        for channel in mixer.get_channels(self):
+            channel.pause()
     def unpause(self):
-        pass
+        if self.is_music():
+            pygame.mixer.music.unpause()
+        for channel in mixer.get_channels(self):
+            channel.unpause()
     def set_volume(self, volume):
         self.volume = volume
-        pass
+        # the buffer is shared between Sounds, so the volume is set on the channels
+        if self.is_music():
+            pygame.mixer.music.set_volume(volume / 100)
+        for channel in mixer.get_channels(self):
+            channel.set_volume(volume / 100)
 
 class Camera:
+    snapshot_fields = ('x', 'y', 'delay', 'zoom', 'minZoom', 'maxZoom')
     def __init__(self, game, x = 0, y = 0, delay = 50, zoom = 1.0, minZoom = 0.1, maxZoom = 3.0):
         self.game = game
         self.x = x
@@ -201,9 +1424,9 @@ class Camera:
         self.zoom = zoom
         self.minZoom = minZoom
         self.maxZoom = maxZoom
-        # self.self_copy = copy.deepcopy(self)
+        self.initial_state = take_snapshot(self, self.snapshot_fields)
     def reset(self):
-        self.__dict__.update(self.self_copy.__dict__)
+        self.__dict__.update(self.initial_state)
     def target(self, x, y):
         # self.x = x - (self.game.width / 2)
         # self.y = y - (self.game.height / 2)
@@ -211,59 +1434,778 @@ class Camera:
         self.y += ((y - self.game.height/2) - self.y) / self.delay
     def set_zoom(self, zoom):
         self.zoom = max(self.minZoom, min(self.maxZoom, zoom))
+    def get_viewport(self):
+        # zoom is centered on the screen, the viewport is the world area that fills it
+        width = self.game.width / self.zoom
+        height = self.game.height / self.zoom
+        return (self.x + (self.game.width - width) / 2, self.y + (self.game.height - height) / 2, width, height)
+    def world_to_screen(self, x, y):
+        if self.zoom == 1:
+            return (x - self.x, y - self.y)
+        viewport_x, viewport_y, _, _ = self.get_viewport()
+        return ((x - viewport_x) * self.zoom, (y - viewport_y) * self.zoom)
+    def screen_to_world(self, x, y):
+        if self.zoom == 1:
+            return (x + self.x, y + self.y)
+        viewport_x, viewport_y, _, _ = self.get_viewport()
+        return (x / self.zoom + viewport_x, y / self.zoom + viewport_y)
+
+class SpatialHash:
+    def __init__(self, cell_size = 64, max_cells = 256):
+        self.cell_size = cell_size
+        # objects covering more cells than this are kept in a single list instead of being hashed
+        self.max_cells = max_cells
+        self.cells = {}
+        self.ranges = {}
+        self.oversized = {}
+    def get_range(self, x, y, width, height):
+        return (int(x // self.cell_size), int(y // self.cell_size), int((x + width) // self.cell_size), int((y + height) // self.cell_size))
+    def insert(self, game_object):
+        cell_range = self.get_range(*game_object.get_bounds())
+        self.ranges[game_object] = cell_range
+        x0, y0, x1, y1 = cell_range
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            self.oversized[game_object] = None
+            return
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                cell = self.cells.get((cell_x, cell_y))
+                if cell == None:
+                    cell = self.cells[(cell_x, cell_y)] = {}
+                cell[game_object] = None
+    def remove(self, game_object):
+        cell_range = self.ranges.pop(game_object, None)
+        if cell_range == None:
+            return
+        if game_object in self.oversized:
+            del self.oversized[game_object]
+            return
+        x0, y0, x1, y1 = cell_range
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                cell = self.cells[(cell_x, cell_y)]
+                del cell[game_object]
+                if not cell:
+                    del self.cells[(cell_x, cell_y)]
+    def update(self, game_object):
+        if self.ranges.get(game_object) != self.get_range(*game_object.get_bounds()):
+            self.remove(game_object)
+            self.insert(game_object)
+    def clear(self):
+        self.cells = {}
+        self.ranges = {}
+        self.oversized = {}
+    def query(self, x, y, width, height):
+        x0, y0, x1, y1 = self.get_range(x, y, width, height)
+        found = dict(self.oversized)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            for (cell_x, cell_y), cell in self.cells.items():
+                if x0 <= cell_x <= x1 and y0 <= cell_y <= y1:
+                    found.update(cell)
+        else:
+            for cell_x in range(x0, x1 + 1):
+                for cell_y in range(y0, y1 + 1):
+                    cell = self.cells.get((cell_x, cell_y))
+                    if cell != None:
+                        found.update(cell)
+        return found.keys()
+
+class SweepAndPrune:
+    def __init__(self):
+        self.keys = []
+        self.game_objects = []
+        self.bounds = {}
+        self.max_width = 0
+    def insert(self, game_object):
+        x, y, width, height = game_object.get_bounds()
+        self.bounds[game_object] = (x, y, width, height)
+        self.max_width = max(self.max_width, width)
+        index = bisect.bisect_right(self.keys, x)
+        self.keys.insert(index, x)
+        self.game_objects.insert(index, game_object)
+    def remove(self, game_object):
+        bounds = self.bounds.pop(game_object, None)
+        if bounds == None:
+            return
+        index = bisect.bisect_left(self.keys, bounds[0])
+        while self.game_objects[index] is not game_object:
+            index += 1
+        del self.keys[index]
+        del self.game_objects[index]
+    def update(self, game_object):
+        bounds = game_object.get_bounds()
+        if self.bounds.get(game_object) != bounds:
+            self.remove(game_object)
+            self.insert(game_object)
+    def clear(self):
+        self.keys = []
+        self.game_objects = []
+        self.bounds = {}
+        self.max_width = 0
+    def query(self, x, y, width, height):
+        start = bisect.bisect_left(self.keys, x - self.max_width)
+        end = bisect.bisect_right(self.keys, x + width)
+        found = []
+        for game_object in self.game_objects[start:end]:
+            x2, y2, width2, height2 = self.bounds[game_object]
+            if x2 + width2 >= x and y2 <= y + height and y2 + height2 >= y:
+                found.append(game_object)
+        return found
+
+class ZOrder:
+    def __init__(self):
+        self.layers = []
+        self.buckets = {}
+        self.keys = {}
+        self.sequence = 0
+    def __len__(self):
+        return len(self.keys)
+    def __iter__(self):
+        for z in self.layers:
+            yield from self.buckets[z][1]
+    def add(self, game_object, sequence = None):
+        if sequence == None:
+            self.sequence += 1
+            sequence = self.sequence
+        z = game_object.z
+        bucket = self.buckets.get(z)
+        if bucket == None:
+            bisect.insort(self.layers, z)
+            bucket = self.buckets[z] = ([], [])
+        # buckets are sorted by insertion sequence so objects keep their order when moving between layers
+        index = bisect.bisect_right(bucket[0], sequence)
+        bucket[0].insert(index, sequence)
+        bucket[1].insert(index, game_object)
+        self.keys[game_object] = (z, sequence)
+    def remove(self, game_object):
+        key = self.keys.pop(game_object, None)
+        if key == None:
+            return None
+        z, sequence = key
+        bucket = self.buckets[z]
+        index = bisect.bisect_left(bucket[0], sequence)
+        del bucket[0][index]
+        del bucket[1][index]
+        if not bucket[0]:
+            del self.buckets[z]
+            del self.layers[bisect.bisect_left(self.layers, z)]
+        return sequence
+    def update(self, game_object):
+        key = self.keys.get(game_object)
+        if key != None and key[0] == game_object.z:
+            return
+        self.add(game_object, self.remove(game_object))
+    def get_key(self, game_object):
+        return self.keys[game_object]
+    def sort(self, game_objects):
+        return sorted(game_objects, key=self.keys.__getitem__)
+    def clear(self):
+        self.layers = []
+        self.buckets = {}
+        self.keys = {}
+
+class Pool:
+    def __init__(self, factory, max_size = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.free = []
+    def create(self):
+        game_object = self.factory()
+        game_object.save_initial_state()
+        return game_object
+    def prewarm(self, count):
+        for _ in range(count):
+            if self.max_size != None and len(self.free) >= self.max_size:
+                break
+            self.free.append(self.create())
+    def take(self):
+        if self.free:
+            game_object = self.free.pop()
+            game_object.restore(game_object.initial_state)
+            return game_object
+        return self.create()
+    def give(self, game_object):
+        if self.max_size == None or len(self.free) < self.max_size:
+            self.free.append(game_object)
+            return True
+        return False
 
 class Scene:
-    def __init__(self, ignore_pause = False):
+    snapshot_fields = ('ignore_pause',)
+    def __init__(self, ignore_pause = False, broadphase = None, assets = []):
         self.name = None
         self.game = None
         self.game_objects = {}
         self.ignore_pause = ignore_pause
-        self.self_copy = copy.deepcopy(self)
+        self.assets = list(assets)
+        self.broadphase = broadphase if broadphase != None else SpatialHash()
+        # gui game objects are indexed apart, by their window coordinates
+        self.gui_broadphase = SpatialHash()
+        self.indexes = {}
+        self.z_order = ZOrder()
+        self.subscribers = {event_name: {} for event_name in list(Events) + GameObjectEvents}
+        self.class_subscriptions = {}
+        self.pools = {}
+        self.pool_names = 0
+        self.tag_index = {}
+        # digests of the last save, delta saves only write what changed since
+        self.saved_state = None
+        self.initial_state = take_snapshot(self, self.snapshot_fields)
     def reset(self):
-        self.self_copy_reset = copy.deepcopy(self.self_copy)
-        self.self_copy_reset.name = self.name
-        self.self_copy_reset.game = self.game
-        self.__dict__.update(self.self_copy_reset.__dict__)
+        for field, value in self.initial_state.items():
+            setattr(self, field, copy_field(value))
+        self.clear_game_objects()
         if hasattr(self, 'load'): self.load()
-
+    def clear_game_objects(self):
         for game_object in self.game_objects.values():
-            game_object.reset()
-            if hasattr(game_object, 'load'): game_object.load()
-
-        self.sort_game_objects_by_z()
-    def add_game_object(self, name, game_object):
+            game_object.scene = None
+        self.game_objects = {}
+        self.broadphase.clear()
+        self.gui_broadphase.clear()
+        self.indexes = {}
+        self.z_order.clear()
+        self.tag_index = {}
+        self.subscribers = {event_name: {} for event_name in self.subscribers}
+    def snapshot(self):
+        return {name: (game_object, game_object.snapshot()) for name, game_object in self.game_objects.items()}
+    def restore(self, snapshot):
+        for name in list(self.game_objects):
+            if name not in snapshot:
+                self.remove_game_object(name)
+        for name, (game_object, state) in snapshot.items():
+            if self.game_objects.get(name) is not game_object:
+                self.insert_game_object(name, game_object)
+            game_object.restore(state)
+    def insert_game_object(self, name, game_object):
+        if name in self.game_objects:
+            self.indexes.pop(self.game_objects[name]).remove(self.game_objects[name])
+            self.z_order.remove(self.game_objects[name])
+            self.unsubscribe(self.game_objects[name])
+            self.unindex_tags(self.game_objects[name])
         self.game_objects[name] = game_object
-        self.game_objects[name].name = name
-        self.game_objects[name].scene = self
+        game_object.name = name
+        game_object.scene = self
+        game_object.save_initial_state()
+        self.indexes[game_object] = self.get_broadphase(game_object)
+        self.indexes[game_object].insert(game_object)
+        self.z_order.add(game_object)
+        self.subscribe(game_object)
+        self.index_tags(game_object)
+        return game_object
+    def add_game_object(self, name, game_object):
+        self.insert_game_object(name, game_object)
 
-        # Sort game objects by z
-        self.sort_game_objects_by_z()
+        if hasattr(game_object, 'load'): game_object.load()
+        return game_object
+    def has_game_object(self, game_object):
+        return self.game_objects.get(game_object.name) is game_object
+    def create_pool(self, game_object_class, prewarm = 0, max_size = None, factory = None):
+        pool = self.pools[game_object_class] = Pool(factory if factory != None else game_object_class, max_size)
+        pool.prewarm(prewarm)
+        return pool
+    def acquire(self, game_object_class, name = None, **fields):
+        pool = self.pools.get(game_object_class)
+        if pool == None:
+            pool = self.create_pool(game_object_class)
+        game_object = pool.take()
+        game_object.pooled = False
+        for field, value in fields.items():
+            setattr(game_object, field, value)
 
-        if hasattr(self.game_objects[name], 'load'): self.game_objects[name].load()
-        return self.game_objects[name]
+        if name == None:
+            name = game_object.name
+        while name == None or name in self.game_objects:
+            self.pool_names += 1
+            name = f'{game_object_class.__name__}-{self.pool_names}'
+        return self.add_game_object(name, game_object)
+    def release(self, game_object):
+        if self.has_game_object(game_object):
+            self.remove_game_object(game_object.name)
+        pool = self.pools.get(type(game_object))
+        if pool == None:
+            pool = self.create_pool(type(game_object))
+        game_object.pooled = pool.give(game_object)
+        return game_object.pooled
     def sort_game_objects_by_z(self):
-        game_objets_values = list(self.game_objects.values())
-        game_objets_values_sorted_by_z = sorted(game_objets_values, key=lambda game_object: game_object.z)
-        game_objets_sorted_by_z = {}
-        for game_object in game_objets_values_sorted_by_z:
-            game_objets_sorted_by_z[game_object.name] = game_object
-        self.game_objects = game_objets_sorted_by_z
+        for game_object in self.game_objects.values():
+            self.z_order.update(game_object)
+    def get_game_objects(self):
+        return list(self.z_order)
     def instant_game_object(self, game_object):
         random_uuid_name = str(uuid.uuid4())
         return self.add_game_object(random_uuid_name, game_object)
     def remove_game_object(self, name):
-        del self.game_objects[name]
+        game_object = self.game_objects.pop(name)
+        self.indexes.pop(game_object).remove(game_object)
+        self.z_order.remove(game_object)
+        self.unsubscribe(game_object)
+        self.unindex_tags(game_object)
     def get_game_object(self, name):
         return self.game_objects[name]
-    def get_game_objects_by_tag(self, tag):
-        objects = []
+    def subscribe(self, game_object):
+        event_names = self.class_subscriptions.get(type(game_object))
+        if event_names == None:
+            attributes = get_class_attributes(type(game_object))
+            event_names = self.class_subscriptions[type(game_object)] = [event_name for event_name in self.subscribers if event_name in attributes]
+        for event_name in event_names:
+            self.subscribers[event_name][game_object] = None
+        for event_name in self.subscribers.keys() & game_object.__dict__.keys():
+            self.subscribers[event_name][game_object] = None
+    def unsubscribe(self, game_object):
+        for subscribers in self.subscribers.values():
+            subscribers.pop(game_object, None)
+    def register_event(self, event_name):
+        if event_name not in self.subscribers:
+            self.subscribers[event_name] = {game_object: None for game_object in self.game_objects.values() if has_handler(game_object, event_name)}
+            self.class_subscriptions = {}
+        return self.subscribers[event_name]
+    def get_subscribers(self, event_name):
+        return list(self.register_event(event_name))
+    def get_broadphase(self, game_object):
+        return self.gui_broadphase if game_object.gui == True else self.broadphase
+    def set_broadphase(self, broadphase):
+        self.broadphase = broadphase
+        for game_object in self.game_objects.values():
+            if self.indexes[game_object] is not self.gui_broadphase:
+                self.indexes[game_object] = broadphase
+                broadphase.insert(game_object)
+    def update_broadphase(self):
         for game_object in self.game_objects.values():
-            if game_object.has_tag(tag):
-                objects.append(game_object)
-        return objects
+            broadphase = self.gui_broadphase if game_object.gui == True else self.broadphase
+            if self.indexes[game_object] is broadphase:
+                broadphase.update(game_object)
+            else:
+                # gui changed, move it to the other index
+                self.indexes[game_object].remove(game_object)
+                self.indexes[game_object] = broadphase
+                broadphase.insert(game_object)
+    def get_game_objects_at(self, x, y, gui = False):
+        point = ObjectPlaceholder(x, y, 0, 0)
+        broadphase = self.gui_broadphase if gui == True else self.broadphase
+        return [game_object for game_object in broadphase.query(x, y, 0, 0) if is_inside(point, game_object)]
+    def get_game_objects_in_region(self, x, y, width, height):
+        region = ObjectPlaceholder(x, y, width, height)
+        return [game_object for game_object in self.broadphase.query(x, y, width, height) if is_collide(game_object, region)]
+    def index_tag(self, game_object, tag):
+        tagged = self.tag_index.get(tag)
+        if tagged == None:
+            tagged = self.tag_index[tag] = {}
+        tagged[game_object] = None
+    def unindex_tag(self, game_object, tag):
+        tagged = self.tag_index.get(tag)
+        if tagged != None:
+            tagged.pop(game_object, None)
+            if not tagged:
+                del self.tag_index[tag]
+    def index_tags(self, game_object):
+        for tag in game_object.tags:
+            self.index_tag(game_object, tag)
+    def unindex_tags(self, game_object):
+        for tag in game_object.tags:
+            self.unindex_tag(game_object, tag)
+    def count_game_objects_by_tag(self, tag):
+        return len(self.tag_index.get(tag, ()))
+    def get_game_objects_by_tag(self, tag):
+        return self.z_order.sort(self.tag_index.get(tag, ()))
+    def get_game_objects_with_any_tag(self, *tags):
+        game_objects = {}
+        for tag in tags:
+            game_objects.update(self.tag_index.get(tag, {}))
+        return self.z_order.sort(game_objects)
+    def get_game_objects_with_all_tags(self, *tags):
+        # start from the smallest group so the checks are as few as possible
+        groups = sorted((self.tag_index.get(tag, {}) for tag in tags), key=len)
+        if not groups:
+            return []
+        return self.z_order.sort(game_object for game_object in groups[0] if all(game_object in group for group in groups[1:]))
+    def get_game_objects_by_tag_in_region(self, tag, x, y, width, height):
+        tagged = self.tag_index.get(tag, {})
+        region = ObjectPlaceholder(x, y, width, height)
+        # few tagged game objects are checked directly, otherwise the broadphase narrows the region first
+        if len(tagged) <= 32:
+            candidates = tagged
+        else:
+            candidates = [game_object for game_object in self.broadphase.query(x, y, width, height) if game_object in tagged]
+        return self.z_order.sort(game_object for game_object in candidates if is_collide(game_object, region))
+    def get_game_objects_by_tag_near(self, tag, x, y, radius):
+        game_objects = self.get_game_objects_by_tag_in_region(tag, x - radius, y - radius, radius * 2, radius * 2)
+        return [game_object for game_object in game_objects if math.hypot(game_object.x + game_object.width / 2 - x, game_object.y + game_object.height / 2 - y) <= radius]
+
+save_magic = b'PYXESAV1'
+
+def get_class_name(cls):
+    return f'{cls.__module__}.{cls.__qualname__}'
+
+def get_game_object_class(name):
+    classes = [GameObject]
+    while classes:
+        cls = classes.pop()
+        if get_class_name(cls) == name:
+            return cls
+        classes.extend(cls.__subclasses__())
+    raise KeyError(f'unknown game object class {name}')
+
+def encode_value(value, arrays):
+    # arrays is a list for the binary format, their data goes after the header, None keeps them inline as base64
+    if numpy != None and isinstance(value, numpy.ndarray):
+        value = numpy.ascontiguousarray(value)
+        if arrays == None:
+            return {'__array__': [value.dtype.str, value.shape, base64.b64encode(value).decode()]}
+        arrays.append(value)
+        return {'__array__': [value.dtype.str, value.shape, len(arrays) - 1]}
+    if numpy != None and isinstance(value, numpy.generic):
+        return value.item()
+    if type(value) == dict:
+        return {key: encode_value(item, arrays) for key, item in value.items()}
+    if type(value) == list:
+        return [encode_value(item, arrays) for item in value]
+    if type(value) == tuple:
+        return {'__tuple__': [encode_value(item, arrays) for item in value]}
+    if type(value) == set:
+        return {'__set__': [encode_value(item, arrays) for item in value]}
+    return value
+
+def decode_value(value, arrays):
+    if type(value) == list:
+        return [decode_value(item, arrays) for item in value]
+    if type(value) != dict:
+        return value
+    if '__tuple__' in value:
+        return tuple(decode_value(item, arrays) for item in value['__tuple__'])
+    if '__set__' in value:
+        return set(decode_value(item, arrays) for item in value['__set__'])
+    if '__array__' in value:
+        dtype, shape, data = value['__array__']
+        if type(data) == str:
+            return numpy.frombuffer(base64.b64decode(data), dtype=dtype).reshape(shape).copy()
+        return arrays(data, dtype, shape)
+    return {key: decode_value(item, arrays) for key, item in value.items()}
+
+def get_digest(value):
+    # big arrays are compared by checksum instead of keeping a copy of them
+    if numpy != None and isinstance(value, numpy.ndarray):
+        return ('array', value.dtype.str, value.shape, zlib.crc32(numpy.ascontiguousarray(value)))
+    if type(value) == dict:
+        return {key: get_digest(item) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return [get_digest(item) for item in value]
+    if type(value) == set:
+        return set(value)
+    return value
+
+def save_scene(scene, path, delta = False, binary = False):
+    objects = {}
+    saved_state = {}
+    for name, game_object in scene.game_objects.items():
+        class_name = get_class_name(type(game_object))
+        fields = game_object.get_save_state()
+        digests = {field: get_digest(value) for field, value in fields.items()}
+        saved_state[name] = (class_name, digests)
+        previous = scene.saved_state.get(name) if delta == True and scene.saved_state != None else None
+        if previous != None and previous[0] == class_name:
+            fields = {field: value for field, value in fields.items() if previous[1].get(field) != digests[field]}
+            if not fields:
+                continue
+        objects[name] = {'class': class_name, 'fields': fields}
+    # the first delta save of a scene is a full save
+    delta = delta == True and scene.saved_state != None
+    removed = [name for name in scene.saved_state if name not in scene.game_objects] if delta == True else []
+
+    arrays = [] if binary == True else None
+    data = {'delta': delta, 'objects': encode_value(objects, arrays), 'removed': removed}
+    if binary == False:
+        write_file(path, [json.dumps(data, separators=(',', ':')).encode()])
+    else:
+        # arrays are aligned so loading can map them straight from the file
+        offset = 0
+        table = []
+        for array in arrays:
+            table.append(offset)
+            offset += -(-array.nbytes // 64) * 64
+        data['arrays'] = table
+        header = json.dumps(data, separators=(',', ':')).encode()
+        header_size = -(-(len(save_magic) + 8 + len(header)) // 64) * 64
+        chunks = [save_magic, struct.pack('<Q', len(header)), header, bytes(header_size - len(save_magic) - 8 - len(header))]
+        for array in arrays:
+            chunks.append(memoryview(array).cast('B'))
+            chunks.append(bytes(-array.nbytes % 64))
+        write_file(path, chunks)
+    scene.saved_state = saved_state
+    return len(objects)
+
+def read_save(path):
+    with open(path, 'rb') as f:
+        if f.read(len(save_magic)) != save_magic:
+            f.seek(0)
+            return decode_value(json.load(f), None)
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        data = json.loads(f.read(header_size))
+        data_offset = -(-(len(save_magic) + 8 + header_size) // 64) * 64
+        # copy on write, arrays are read from disk when used and changes never reach the file
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    def get_array(index, dtype, shape):
+        dtype = numpy.dtype(dtype)
+        count = math.prod(shape)
+        if count == 0:
+            return numpy.zeros(shape, dtype=dtype)
+        return numpy.frombuffer(buffer, dtype=dtype, count=count, offset=data_offset + data['arrays'][index]).reshape(shape)
+    return decode_value(data, get_array)
+
+def load_scene(scene, path, classes = {}):
+    # game objects already in the scene are restored, missing ones are created with their class save_args
+    data = read_save(path)
+    removed = data['removed'] if data['delta'] == True else [name for name in scene.game_objects if name not in data['objects']]
+    for name in removed:
+        if name in scene.game_objects:
+            scene.remove_game_object(name)
+    for name, record in data['objects'].items():
+        fields = record['fields']
+        game_object = scene.game_objects.get(name)
+        if game_object == None or get_class_name(type(game_object)) != record['class']:
+            cls = classes.get(record['class']) or get_game_object_class(record['class'])
+            game_object = cls(**{arg: fields[arg] for arg in cls.save_args if arg in fields})
+            scene.insert_game_object(name, game_object)
+        game_object.restore(fields, copy=False)
+    # the loaded state is not digested, the next delta save is a full save
+    scene.saved_state = None
+    return scene
+
+def get_png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def encode_png(surface, compression = 6):
+    # pygame.image.save keeps the GIL while encoding, zlib releases it so the game keeps running
+    width, height = surface.get_size()
+    pixels = pygame.image.tobytes(surface, 'RGB')
+    stride = width * 3
+    rows = b''.join(b'\x00' + pixels[index:index + stride] for index in range(0, len(pixels), stride))
+    return (
+        b'\x89PNG\r\n\x1a\n' +
+        get_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+        get_png_chunk(b'IDAT', zlib.compress(rows, compression)) +
+        get_png_chunk(b'IEND', b'')
+    )
+
+class Capture:
+    def __init__(self, game, max_queue = 16):
+        self.game = game
+        # frames waiting to be written, a full queue drops frames instead of stalling the game
+        self.queue = queue.Queue(max_queue)
+        self.worker = None
+        self.folders = set()
+        self.paths = set()
+        self.recording = False
+        self.record_folder = None
+        self.record_name = None
+        self.record_format = None
+        self.record_every = 1
+        self.record_max_frames = None
+        self.recorded_frames = 0
+        self.record_tick = 0
+        self.saved_count = 0
+        self.dropped_count = 0
+        self.errors = []
+    def start_worker(self):
+        if self.worker == None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self.work, name='pyxes-capture', daemon=True)
+            self.worker.start()
+    def work(self):
+        raw_file = None
+        while True:
+            kind, path, frame = self.queue.get()
+            try:
+                folder = os.path.dirname(path)
+                if folder and folder not in self.folders:
+                    os.makedirs(folder, exist_ok=True)
+                    self.folders.add(folder)
+                if kind == 'png':
+                    with open(path, 'wb') as file:
+                        file.write(encode_png(frame))
+                    self.saved_count += 1
+                elif kind == 'raw':
+                    if raw_file == None or raw_file.name != path:
+                        if raw_file != None:
+                            raw_file.close()
+                        raw_file = open(path, 'wb')
+                    raw_file.write(pygame.image.tobytes(frame, 'RGB'))
+                    self.saved_count += 1
+                elif kind == 'close':
+                    if raw_file != None:
+                        raw_file.close()
+                        raw_file = None
+                    write_json(path, frame)
+            except (OSError, pygame.error) as error:
+                self.errors.append((path, error))
+            finally:
+                self.queue.task_done()
+    def submit(self, kind, path, frame):
+        self.start_worker()
+        try:
+            self.queue.put_nowait((kind, path, frame))
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+    def screenshot(self, folder_path = 'screenshots'):
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        path = os.path.join(folder_path, f'{self.game.title} screenshot - {timestamp}.png')
+        count = 1
+        while path in self.paths:
+            count += 1
+            path = os.path.join(folder_path, f'{self.game.title} screenshot - {timestamp} ({count}).png')
+        # copying the screen is cheap, encoding the png happens in the worker
+        if self.submit('png', path, self.game.screen.copy()) == False:
+            return None
+        self.paths.add(path)
+        return path
+    def start_recording(self, folder_path = 'recordings', format = 'png', every = 1, max_frames = None):
+        if self.recording == True:
+            self.stop_recording()
+        self.recording = True
+        self.record_folder = folder_path
+        self.record_format = format
+        self.record_every = every
+        self.record_max_frames = max_frames
+        self.recorded_frames = 0
+        self.record_tick = 0
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.record_name = timestamp
+        count = 1
+        while os.path.join(folder_path, self.record_name) in self.paths:
+            count += 1
+            self.record_name = f'{timestamp} ({count})'
+        self.paths.add(os.path.join(folder_path, self.record_name))
+    def stop_recording(self):
+        if self.recording == False:
+            return
+        self.recording = False
+        if self.record_format == 'raw':
+            # describes the raw rgb24 frames, e.g. for ffmpeg -f rawvideo -pix_fmt rgb24 -s WIDTHxHEIGHT
+            width, height = self.game.screen.get_size()
+            info = {'width': width, 'height': height, 'pixel_format': 'rgb24', 'fps': self.game.fps / self.record_every, 'frames': self.recorded_frames}
+            self.start_worker()
+            self.queue.put(('close', os.path.join(self.record_folder, f'{self.record_name}.json'), info))
+    def capture_frame(self):
+        self.record_tick += 1
+        if (self.record_tick - 1) % self.record_every != 0:
+            return
+        if self.record_format == 'raw':
+            path = os.path.join(self.record_folder, f'{self.record_name}.rgb')
+            kind = 'raw'
+        else:
+            # dropped frames leave gaps in the numbers
+            path = os.path.join(self.record_folder, self.record_name, f'frame_{(self.record_tick - 1) // self.record_every + 1:06d}.png')
+            kind = 'png'
+        if self.submit(kind, path, self.game.screen.copy()) == True:
+            self.recorded_frames += 1
+        if self.record_max_frames != None and self.recorded_frames >= self.record_max_frames:
+            self.stop_recording()
+    def is_busy(self):
+        return self.queue.unfinished_tasks > 0
+    def flush(self):
+        if self.worker != None:
+            self.queue.join()
+
+class Profiler:
+    phases = ['events', 'scene_update', 'update', 'collision', 'draw', 'present', 'idle']
+    def __init__(self, size = 300, detailed = False):
+        self.enabled = False
+        self.detailed = detailed
+        self.overlay = False
+        self.size = size
+        self.frames = collections.deque(maxlen=size)
+        self.hot_spots = {}
+        self.current = None
+        self.frame_start = 0
+        self.phase_start = 0
+        self.font = None
+    def enable(self, detailed = None):
+        self.enabled = True
+        if detailed != None:
+            self.detailed = detailed
+    def disable(self):
+        self.enabled = False
+        self.current = None
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay == True:
+            self.enabled = True
+    def clear(self):
+        self.frames.clear()
+        self.hot_spots = {}
+    def begin_frame(self):
+        if self.enabled == False:
+            return
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.frame_start = time.perf_counter()
+    def end_frame(self):
+        if self.current == None:
+            return
+        self.current['frame'] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames.append(self.current)
+        self.current = None
+    def start(self, phase):
+        if self.current != None:
+            self.phase_start = time.perf_counter()
+    def stop(self, phase):
+        if self.current != None:
+            self.current[phase] += (time.perf_counter() - self.phase_start) * 1000
+    def is_detailed(self):
+        return self.current != None and self.detailed == True
+    def record(self, kind, game_object, milliseconds):
+        for key in ((kind, 'class', type(game_object).__name__), (kind, 'object', str(game_object.name))):
+            hot_spot = self.hot_spots.get(key)
+            if hot_spot == None:
+                hot_spot = self.hot_spots[key] = [0, 0.0]
+            hot_spot[0] += 1
+            hot_spot[1] += milliseconds
+    def get_averages(self):
+        averages = dict.fromkeys(self.phases + ['frame'], 0.0)
+        for frame in self.frames:
+            for phase, milliseconds in frame.items():
+                averages[phase] += milliseconds
+        if self.frames:
+            for phase in averages:
+                averages[phase] /= len(self.frames)
+        return averages
+    def get_hot_spots(self, count = 10, kind = None, group = None):
+        hot_spots = [
+            {'kind': key[0], 'group': key[1], 'name': key[2], 'calls': calls, 'total': total, 'average': total / calls}
+            for key, (calls, total) in self.hot_spots.items()
+            if (kind == None or key[0] == kind) and (group == None or key[1] == group)
+        ]
+        hot_spots.sort(key=lambda hot_spot: hot_spot['total'], reverse=True)
+        return hot_spots[:count]
+    def export_json(self, path):
+        write_json(path, {'averages': self.get_averages(), 'frames': list(self.frames), 'hot_spots': self.get_hot_spots(len(self.hot_spots))})
+    def export_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame_index'] + self.phases + ['frame'])
+            for index, frame in enumerate(self.frames):
+                writer.writerow([index] + [round(frame[phase], 4) for phase in self.phases + ['frame']])
+    def draw_overlay(self, screen):
+        if self.font == None:
+            self.font = pygame.font.Font(None, 18)
+        averages = self.get_averages()
+        lines = [f'frame {averages["frame"]:.2f} ms'] + [f'{phase} {averages[phase]:.2f} ms' for phase in self.phases]
+        lines += [f'{hot_spot["kind"]} {hot_spot["name"]} {hot_spot["total"]:.1f} ms' for hot_spot in self.get_hot_spots(5, group='class')]
+        surfaces = [self.font.render(line, True, Colors['white']) for line in lines]
+        rect = pygame.Rect(0, 0, max(surface.get_width() for surface in surfaces) + 8, sum(surface.get_height() for surface in surfaces) + 8)
+        screen.fill(Colors['black'], rect)
+        y = 4
+        for surface in surfaces:
+            screen.blit(surface, (4, y))
+            y += surface.get_height()
+        return rect
 
 class Game:
-    def __init__(self, width = 640, height = 480, bg_color = Colors['black'], bg_alpha = 255, title = 'Title', cursor = True, fps = 60, fill_on_pause = True, quit_on_escape = False, default_scene = Scene()):
+    def __init__(self, width = 640, height = 480, bg_color = Colors['black'], bg_alpha = 255, title = 'Title', cursor = True, fps = 60, fill_on_pause = True, quit_on_escape = False, default_scene = Scene(), dirty_rects = False, culling = True, headless = False, fixed_timestep = None, batching = True):
+        self.headless = headless
+        if self.headless == True:
+            # SDL dummy drivers must be selected before pygame starts
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
         pygame.init()
         self.set_title(title)
         self.width = width
@@ -275,6 +2217,13 @@ class Game:
         self.clock = pygame.time.Clock()
         self.fps = fps
         self.prev_time = pygame.time.get_ticks()
+        self.delta_time = 0.0
+        self.fixed_timestep = fixed_timestep
+        self.max_frame_time = 0.25
+        self.accumulator = 0.0
+        self.interpolation = 0.0
+        self.frame_count = 0
+        self.simulation_time = 0.0
 
         self.set_cursor_visibility(cursor)
 
@@ -287,7 +2236,33 @@ class Game:
         self.pause = False
         self.fill_on_pause = fill_on_pause
 
+        self.bg_surface = None
+        self.bg_key = None
+        self.dirty_rects = dirty_rects
+        self.dirty_full = True
+        self.dirty_states = {}
+        self.dirty_view = None
+        self.dirty_rect_count = 0
+        self.overlay_rect = None
+        self.culling = culling
+        self.culled_count = 0
+        self.drawn_count = 0
+        self.batching = batching
+        self.loading_scene = None
+        self.hover_scene = None
+        self.hovered = {}
+        # game objects can move outside of update, in event handlers, on_collide or between steps
+        self.broadphase_dirty = True
+        self.broadphase_scene = None
+        self.blit_batch = []
+        self.blit_calls = 0
+
+        self.profiler = Profiler()
+        self.capture = Capture(self)
+
         self.pygame = pygame
+        self.pygame_events = dict(Events)
+        self.pygame_event_names = {event_type: event_name for event_name, event_type in self.pygame_events.items()}
 
         self.scenes = {}
         self.active_scene = None
@@ -298,117 +2273,337 @@ class Game:
     def run(self):
         self.running = True
         while self.running:
+            self.profiler.begin_frame()
+            self.profiler.start('events')
+            self.update_loading()
             active_scene = self.get_active_scene()
-            game_objects = active_scene.game_objects.values()
-
-            self.pygame_events = {
-                'key_down': pygame.KEYDOWN,
-                'key_up': pygame.KEYUP,
-                'mouse_down': pygame.MOUSEBUTTONDOWN,
-                'mouse_up': pygame.MOUSEBUTTONUP,
-                'mouse_motion': pygame.MOUSEMOTION,
-                'mouse_wheel': pygame.MOUSEWHEEL,
-                'joy_axis_motion': pygame.JOYAXISMOTION,
-                'joy_button_down': pygame.JOYBUTTONDOWN,
-                'joy_button_up': pygame.JOYBUTTONUP,
-                'quit': pygame.QUIT,
-                'fullscreen': pygame.FULLSCREEN,
-                'resize': pygame.VIDEORESIZE,
-                'expose': pygame.VIDEOEXPOSE,
-                'focus': pygame.ACTIVEEVENT,
-            }
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE and self.quit_on_escape:
-                        self.running = False
-                elif event.type == pygame.MOUSEMOTION:
-                    self.mouse_fixed_posotion_x = event.pos[0]
-                    self.mouse_fixed_posotion_y = event.pos[1]
-                    self.mouse_posotion_x = event.pos[0] + self.camera.x
-                    self.mouse_posotion_y = event.pos[1] + self.camera.y
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    for game_object in game_objects:
-                        cursor = None
-                        if game_object.gui == True:
-                            cursor = ObjectPlaceholder(event.pos[0], event.pos[1], 0, 0)
-                        else:
-                            cursor = ObjectPlaceholder(event.pos[0] + self.camera.x, event.pos[1] + self.camera.y, 0, 0)
-                        if is_inside(cursor, game_object) and hasattr(game_object, 'on_click') and game_object.active == True and ((game_object.ignore_pause == True and self.pause == True) or (self.pause == False)):
-                            getattr(game_object, 'on_click')(event)
-                for eventName in self.pygame_events:
-                    if event.type == self.pygame_events[eventName]:
-                        key_name = None
-                        if hasattr(event, 'key'): key_name = pygame.key.name(event.key)
-                        if hasattr(self, eventName):
-                            getattr(self, eventName)(event, key_name)
-                        if hasattr(active_scene, eventName):
-                            getattr(active_scene, eventName)(event, key_name)
-                        for game_object in game_objects:
-                            if hasattr(game_object, eventName) and game_object.active == True and ((game_object.ignore_pause == True and self.pause == True) or (self.pause == False)):
-                                getattr(game_object, eventName)(event, key_name)
+            self.handle_events(active_scene)
+            self.profiler.stop('events')
 
             current_time = pygame.time.get_ticks()
-            self.delta_time = (current_time - self.prev_time) / 1000.0
+            elapsed_time = (current_time - self.prev_time) / 1000.0
             self.prev_time = current_time
 
-            if self.camera.zoom != 1.0:
-                self.screen.fill(self.bg_color)
-
-            if self.pause == False or (self.pause == True and self.fill_on_pause == True):
-                self.bg_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                self.bg_surface.set_alpha(self.bg_alpha)
-                self.bg_surface.fill(self.bg_color)
-                self.screen.blit(self.bg_surface, (0, 0))
-
-            if hasattr(self, 'update'):
-                self.update()
-
-            if hasattr(self, 'draw'):
-                self.draw()
-
-            if ((active_scene.ignore_pause == True and self.pause == True) or (self.pause == False)):
-                if hasattr(active_scene, 'update'):
-                    active_scene.update()
-                if hasattr(active_scene, 'draw'):
-                    active_scene.draw()
-
-            for game_object in game_objects:
-                if game_object.active == True:
-                    if ((game_object.ignore_pause == True and self.pause == True) or (self.pause == False)):
-                        # Check collision
-                        for game_object_2 in game_objects:
-                            if game_object_2.active == True:
-                                if game_object.id != game_object_2.id and game_object.gui == False and game_object_2.gui == False and is_collide(game_object, game_object_2):
-                                    if hasattr(game_object, 'on_collide'):
-                                        game_object.on_collide(game_object_2)
-                                    if hasattr(game_object_2, 'on_collide') and ((game_object_2.ignore_pause == True and self.pause == True) or (self.pause == False)):
-                                        game_object_2.on_collide(game_object)
-
-                        if hasattr(game_object, 'update'):
-                            game_object.update()
-
-                    if game_object.visible == True:
-                        game_object.drawing()
-                        if hasattr(game_object, 'drawing_image'):
-                            game_object.drawing_image()
-                        if hasattr(game_object, 'drawing_text'):
-                            game_object.drawing_text()
-                        if hasattr(game_object, 'draw'):
-                            game_object.draw()
-
-            # Draw the zoomed screen
-            if self.camera.zoom != 1.0:
-                scaled_screen = pygame.transform.scale(self.screen, (int(self.width * self.camera.zoom), int(self.height * self.camera.zoom)))
-                self.screen.fill(self.bg_color)
-                scaled_screen_position = (self.width/2 - scaled_screen.get_size()[0]/2, self.height/2 - scaled_screen.get_size()[1]/2)
-                self.screen.blit(scaled_screen, scaled_screen_position)
+            if self.fixed_timestep == None:
+                self.delta_time = elapsed_time
+                self.simulate(active_scene)
+            else:
+                # a long frame doesn't make the simulation try to catch up forever
+                self.accumulator += min(elapsed_time, self.max_frame_time)
+                while self.accumulator >= self.fixed_timestep:
+                    self.delta_time = self.fixed_timestep
+                    self.simulate(self.get_active_scene())
+                    self.accumulator -= self.fixed_timestep
+                self.interpolation = self.accumulator / self.fixed_timestep
 
-            pygame.display.flip()
-            pygame.display.update()
+            self.render(self.get_active_scene())
+
+            self.profiler.start('idle')
             self.clock.tick(self.fps)
+            self.profiler.stop('idle')
+            self.profiler.end_frame()
+        self.capture.stop_recording()
+        self.capture.flush()
+    def step(self, steps = 1, draw = True):
+        self.update_loading()
+        self.handle_events(self.get_active_scene())
+        for _ in range(steps):
+            self.delta_time = self.fixed_timestep if self.fixed_timestep != None else 1 / (self.fps or 60)
+            self.simulate(self.get_active_scene())
+        if draw == True:
+            self.render(self.get_active_scene())
+    def simulate(self, active_scene):
+        self.update_scene(active_scene)
+        self.frame_count += 1
+        self.simulation_time += self.delta_time
+    def render(self, active_scene):
+        self.profiler.start('draw')
+        rects = self.draw_scene(active_scene)
+        self.overlay_rect = None
+        if self.profiler.overlay == True:
+            self.overlay_rect = self.profiler.draw_overlay(self.screen)
+            if rects != None:
+                rects.append(self.overlay_rect)
+        self.profiler.stop('draw')
+
+        self.profiler.start('present')
+        if self.capture.recording == True:
+            self.capture.capture_frame()
+        self.present(rects)
+        self.profiler.stop('present')
+    def handle_events(self, active_scene):
+        self.broadphase_dirty = True
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE and self.quit_on_escape:
+                    self.running = False
+            elif event.type == pygame.MOUSEMOTION:
+                self.mouse_fixed_posotion_x = event.pos[0]
+                self.mouse_fixed_posotion_y = event.pos[1]
+                self.mouse_posotion_x, self.mouse_posotion_y = self.camera.screen_to_world(*event.pos)
+                self.update_hover(active_scene, event)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if active_scene.subscribers['on_click']:
+                    game_objects = self.get_game_objects_under(active_scene, event.pos, ('on_click',))
+                    if game_objects:
+                        game_objects[0].on_click(event)
+                        self.broadphase_dirty = True
+            event_name = self.pygame_event_names.get(event.type)
+            if event_name != None:
+                key_name = None
+                if hasattr(event, 'key'): key_name = pygame.key.name(event.key)
+                if hasattr(self, event_name):
+                    getattr(self, event_name)(event, key_name)
+                    self.broadphase_dirty = True
+                if hasattr(active_scene, event_name):
+                    getattr(active_scene, event_name)(event, key_name)
+                    self.broadphase_dirty = True
+                for game_object in active_scene.get_subscribers(event_name):
+                    if game_object.active == True and self.can_update(game_object):
+                        getattr(game_object, event_name)(event, key_name)
+                        self.broadphase_dirty = True
+    def update_scene(self, active_scene):
+        self.profiler.start('scene_update')
+        if hasattr(self, 'update'):
+            self.update()
+
+        if self.can_update(active_scene):
+            if hasattr(active_scene, 'update'):
+                active_scene.update()
+        self.profiler.stop('scene_update')
+
+        self.profiler.start('update')
+        detailed = self.profiler.is_detailed()
+        for game_object in active_scene.get_game_objects():
+            # skip game objects removed or released earlier in this frame
+            if game_object.active == True and self.can_update(game_object) and active_scene.has_game_object(game_object):
+                if hasattr(game_object, 'update'):
+                    if detailed == True:
+                        start = time.perf_counter()
+                        game_object.update()
+                        self.profiler.record('update', game_object, (time.perf_counter() - start) * 1000)
+                    else:
+                        game_object.update()
+        self.profiler.stop('update')
+
+        self.profiler.start('collision')
+        self.broadphase_dirty = True
+        self.refresh_broadphase(active_scene)
+        self.check_collisions(active_scene)
+        self.profiler.stop('collision')
+    def get_background(self):
+        bg_key = (self.width, self.height, tuple(self.bg_color), self.bg_alpha)
+        if bg_key != self.bg_key:
+            self.bg_key = bg_key
+            self.bg_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+            self.bg_surface.set_alpha(self.bg_alpha)
+            self.bg_surface.fill(self.bg_color)
+        return self.bg_surface
+    def draw_game_object(self, game_object):
+        if self.profiler.is_detailed():
+            start = time.perf_counter()
+            self.draw_game_object_surfaces(game_object)
+            self.flush_blits()
+            self.profiler.record('draw', game_object, (time.perf_counter() - start) * 1000)
+        else:
+            self.draw_game_object_surfaces(game_object)
+    def draw_game_object_surfaces(self, game_object):
+        game_object.drawing()
+        if hasattr(game_object, 'drawing_image'):
+            game_object.drawing_image()
+        if hasattr(game_object, 'drawing_text'):
+            game_object.drawing_text()
+        if hasattr(game_object, 'draw'):
+            # custom drawing goes straight to the screen, so everything before it must be drawn first
+            self.flush_blits()
+            game_object.draw()
+    def blit(self, surface, position, area = None):
+        if self.batching == False:
+            self.screen.blit(surface, position, area)
+            self.blit_calls += 1
+        elif area == None:
+            self.blit_batch.append((surface, position))
+        else:
+            self.blit_batch.append((surface, position, area))
+    def blit_many(self, blits):
+        if self.batching == False:
+            self.screen.blits(blits, False)
+            self.blit_calls += 1
+        else:
+            self.blit_batch.extend(blits)
+    def flush_blits(self):
+        if self.blit_batch:
+            self.screen.blits(self.blit_batch, False)
+            self.blit_batch.clear()
+            self.blit_calls += 1
+    def get_visible_game_objects(self, active_scene):
+        if self.culling == False:
+            game_objects = [game_object for game_object in active_scene.get_game_objects() if game_object.active == True and game_object.visible == True]
+            self.culled_count = 0
+            self.drawn_count = len(game_objects)
+            return game_objects
+
+        self.refresh_broadphase(active_scene)
+        viewport = self.camera.get_viewport()
+        screen_area = (0, 0, self.width, self.height)
+        # gui game objects are indexed by their window coordinates
+        candidates = dict.fromkeys(active_scene.broadphase.query(*viewport))
+        candidates.update(dict.fromkeys(active_scene.gui_broadphase.query(*screen_area)))
+        custom_drawn = active_scene.register_event('draw')
+        candidates.update(custom_drawn)
+
+        game_objects = []
+        for game_object in candidates:
+            if game_object.active == False or game_object.visible == False:
+                continue
+            if game_object in custom_drawn or bounds_collide(game_object.get_bounds(), screen_area if game_object.gui == True else viewport):
+                game_objects.append(game_object)
+        self.culled_count = len(active_scene.game_objects) - len(game_objects)
+        self.drawn_count = len(game_objects)
+        return active_scene.z_order.sort(game_objects)
+    def draw_scene(self, active_scene):
+        game_objects = self.get_visible_game_objects(active_scene)
+        if self.dirty_rects == True:
+            rects = self.draw_dirty_rects(active_scene, game_objects)
+            if rects != None:
+                return rects
+
+        if self.pause == False or (self.pause == True and self.fill_on_pause == True):
+            self.screen.blit(self.get_background(), (0, 0))
+
+        if hasattr(self, 'draw'):
+            self.draw()
+
+        if self.can_update(active_scene):
+            if hasattr(active_scene, 'draw'):
+                active_scene.draw()
+
+        self.blit_calls = 0
+        for game_object in game_objects:
+            self.draw_game_object(game_object)
+        self.flush_blits()
+        return None
+    def present(self, rects = None):
+        if self.headless == True:
+            return
+        if rects == None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+    def draw_dirty_rects(self, active_scene, game_objects):
+        previous_states = self.dirty_states
+        self.dirty_states = {}
+        screen_rects = []
+        rects = []
+        # the profiler overlay can shrink or be turned off, what was under it is drawn again
+        if self.overlay_rect != None:
+            rects.append(self.overlay_rect)
+        for game_object in game_objects:
+            screen_rect = game_object.get_screen_rect()
+            draw_state = game_object.get_draw_state()
+            screen_rects.append(screen_rect)
+            previous_state = previous_states.pop(game_object, None)
+            self.dirty_states[game_object] = (screen_rect, draw_state, game_object.z)
+            if draw_state == None or previous_state != self.dirty_states[game_object]:
+                if previous_state != None:
+                    rects.append(previous_state[0])
+                rects.append(screen_rect)
+        # removed or hidden game objects
+        for previous_state in previous_states.values():
+            rects.append(previous_state[0])
+
+        # things that can change anything on screen need a full redraw
+        view = (active_scene, self.camera.x, self.camera.y, self.camera.zoom, self.width, self.height)
+        full = (
+            self.dirty_full == True or
+            view != self.dirty_view or
+            self.bg_alpha != 255 or
+            (self.pause == True and self.fill_on_pause == False) or
+            hasattr(self, 'draw') or
+            hasattr(active_scene, 'draw') or
+            len(active_scene.register_event('draw')) > 0
+        )
+        self.dirty_view = view
+        self.dirty_full = False
+        if full == True:
+            self.dirty_rect_count = 1
+            return None
+
+        merged_rects = []
+        screen_area = self.screen.get_rect()
+        for rect in rects:
+            rect = rect.clip(screen_area)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            index = rect.collidelist(merged_rects)
+            while index != -1:
+                rect = rect.union(merged_rects.pop(index))
+                index = rect.collidelist(merged_rects)
+            merged_rects.append(rect)
+
+        background = self.get_background()
+        self.blit_calls = 0
+        for rect in merged_rects:
+            self.screen.set_clip(rect)
+            self.screen.blit(background, rect, rect)
+            for index in rect.collidelistall(screen_rects):
+                self.draw_game_object(game_objects[index])
+            self.flush_blits()
+        self.screen.set_clip(None)
+
+        self.dirty_rect_count = len(merged_rects)
+        return merged_rects
+    def get_game_objects_under(self, active_scene, position, event_names = ()):
+        self.refresh_broadphase(active_scene)
+        # top-most first, gui and world game objects share the z order
+        game_objects = active_scene.get_game_objects_at(*position, gui=True) + active_scene.get_game_objects_at(*self.camera.screen_to_world(*position))
+        subscribers = [active_scene.subscribers[event_name] for event_name in event_names]
+        game_objects = [
+            game_object for game_object in game_objects
+            if game_object.active == True and self.can_update(game_object) and (not subscribers or any(game_object in subscribed for subscribed in subscribers))
+        ]
+        game_objects = active_scene.z_order.sort(game_objects)
+        game_objects.reverse()
+        return game_objects
+    def pick(self, x, y):
+        self.broadphase_dirty = True
+        game_objects = self.get_game_objects_under(self.get_active_scene(), (x, y))
+        return game_objects[0] if game_objects else None
+    def update_hover(self, active_scene, event):
+        if active_scene is not self.hover_scene:
+            self.hover_scene = active_scene
+            self.hovered = {}
+        enter_subscribers = active_scene.subscribers['mouse_enter']
+        leave_subscribers = active_scene.subscribers['mouse_leave']
+        if not enter_subscribers and not leave_subscribers and not self.hovered:
+            return
+        hovered = dict.fromkeys(self.get_game_objects_under(active_scene, event.pos, ('mouse_enter', 'mouse_leave')))
+        for game_object in self.hovered:
+            if game_object not in hovered and game_object in leave_subscribers:
+                game_object.mouse_leave(event)
+                self.broadphase_dirty = True
+        for game_object in hovered:
+            if game_object not in self.hovered and game_object in enter_subscribers:
+                game_object.mouse_enter(event)
+                self.broadphase_dirty = True
+        self.hovered = hovered
+    def can_update(self, target):
+        return target.ignore_pause == True or self.pause == False
+    def refresh_broadphase(self, active_scene):
+        if self.broadphase_dirty == True or active_scene is not self.broadphase_scene:
+            active_scene.update_broadphase()
+            self.broadphase_dirty = False
+            self.broadphase_scene = active_scene
+    def check_collisions(self, scene):
+        for game_object in scene.get_subscribers('on_collide'):
+            if game_object.active == False or game_object.gui == True or not self.can_update(game_object) or not scene.has_game_object(game_object):
+                continue
+            for game_object_2 in scene.broadphase.query(*game_object.get_bounds()):
+                if game_object_2 is not game_object and game_object_2.active == True and game_object_2.gui == False and game_object_2.collidable == True and objects_collide(game_object, game_object_2):
+                    game_object.on_collide(game_object_2)
+                    self.broadphase_dirty = True
     def set_title(self, title):
         self.title = title
         pygame.display.set_caption(title)
@@ -418,11 +2613,36 @@ class Game:
         self.scenes[name].game = self
         if hasattr(self.scenes[name], 'load'): self.scenes[name].load()
         return self.scenes[name]
-    def change_scene(self, name):
+    def change_scene(self, name, preload = False):
+        if preload == True:
+            return self.preload_scene(name, self.scenes[name])
+        self.loading_scene = None
         self.active_scene = name
-    def set_scene(self, name, scene):
+        self.dirty_full = True
+    def set_scene(self, name, scene, preload = False):
+        if preload == True:
+            return self.preload_scene(name, scene)
         self.add_scene(name, scene)
         self.change_scene(name)
+    def preload_scene(self, name, scene):
+        # the current scene keeps running until the images of the new one are loaded
+        self.loading_scene = (name, scene, assets.load_images_async(scene.assets))
+        self.update_loading()
+        return self.loading_scene[2] if self.loading_scene != None else None
+    def update_loading(self):
+        if not assets.tasks and self.loading_scene == None:
+            return
+        assets.poll()
+        if self.loading_scene != None and self.loading_scene[2].is_done():
+            name, scene, task = self.loading_scene
+            self.loading_scene = None
+            if self.scenes.get(name) is not scene:
+                self.add_scene(name, scene)
+            self.change_scene(name)
+    def get_loading_progress(self):
+        if self.loading_scene == None:
+            return 1.0
+        return self.loading_scene[2].get_progress()
     def get_active_scene(self):
         return self.scenes[self.active_scene]
     def remove_scene(self, name):
@@ -431,6 +2651,7 @@ class Game:
         self.get_active_scene().reset()
     def set_fullscreen(self, fullscreen = True):
         self.fullscreen = fullscreen
+        self.dirty_full = True
         if fullscreen == True:
             self.screen = pygame.display.set_mode((self.width, self.height), pygame.FULLSCREEN)
         else:
@@ -441,19 +2662,22 @@ class Game:
         self.width = width
         self.height = height
         self.screen = pygame.display.set_mode((self.width, self.height))
+        self.dirty_full = True
     def set_pause(self, pause):
         self.pause = pause
         active_scene = self.get_active_scene()
-        game_objects = active_scene.game_objects.values()
 
         if hasattr(self, 'on_pause'):
             self.on_pause(self.pause)
 
-        if hasattr(active_scene, 'on_pause') and ((active_scene.ignore_pause == True and self.pause == True) or (self.pause == False)):
+        if hasattr(active_scene, 'on_pause') and self.can_update(active_scene):
             active_scene.on_pause(self.pause)
-        for game_object in game_objects:
-            if hasattr(game_object, 'on_pause') and ((game_object.ignore_pause == True and self.pause == True) or (self.pause == False)):
+        for game_object in active_scene.get_subscribers('on_pause'):
+            if self.can_update(game_object):
                 game_object.on_pause(self.pause)
+    def set_dirty_rects(self, dirty_rects = True):
+        self.dirty_rects = dirty_rects
+        self.dirty_full = True
     def toggle_pause(self):
         self.set_pause(not self.pause)
     def set_fps(self, fps):
@@ -474,25 +2698,22 @@ class Game:
         pygame.mouse.set_visible(True)
     def custom_event(self, eventName, prop = None):
         active_scene = self.get_active_scene()
-        game_objects = active_scene.game_objects.values()
 
         if hasattr(self, eventName):
             getattr(self, eventName)(prop)
 
-        if hasattr(active_scene, eventName) and ((active_scene.ignore_pause == True and self.pause == True) or (self.pause == False)):
+        if hasattr(active_scene, eventName) and self.can_update(active_scene):
             getattr(active_scene, eventName)(prop)
 
-        for game_object in game_objects:
-            if hasattr(game_object, eventName) and ((game_object.ignore_pause == True and self.pause == True) or (self.pause == False)):
+        for game_object in active_scene.get_subscribers(eventName):
+            if self.can_update(game_object):
                 getattr(game_object, eventName)(prop)
     def screenshot(self, folder_path = 'screenshots'):
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-        now = datetime.datetime.now()
-        timestamp = now.strftime("%Y-%m-%d_%H-%M-%S")
-        screenshot_file_name = f'{self.title} screenshot - {timestamp}.png'
-        screenshot_file_path = os.path.join(folder_path, screenshot_file_name)
-        pygame.image.save(self.screen, screenshot_file_path)
+        return self.capture.screenshot(folder_path)
+    def start_recording(self, folder_path = 'recordings', format = 'png', every = 1, max_frames = None):
+        self.capture.start_recording(folder_path, format, every, max_frames)
+    def stop_recording(self):
+        self.capture.stop_recording()
     def set_icon(self, path):
         self.icon_path = path
         self.icon_image = pygame.image.load(path)